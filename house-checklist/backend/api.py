@@ -4,18 +4,30 @@ House Checklist API
 Serves the house checklist data and handles updates
 """
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
 from typing import Dict, Optional, List
 from house_parser import HouseChecklistParser
 from file_watcher import FileWatcher
+from http_cache import ConditionalGetMiddleware
 import json
 import asyncio
 from datetime import datetime
 
 app = FastAPI(title="House Checklist API")
 
+# Read endpoints answer 304 Not Modified while the checklist file is unchanged
+app.add_middleware(
+    ConditionalGetMiddleware,
+    current_etag=lambda: checklist_etag(),
+    paths=["/house-checklist", "/statistics"],
+)
+
+# Compress large bodies
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -23,30 +35,111 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 # Initialize parser
 parser = HouseChecklistParser()
 
+def checklist_etag() -> Optional[str]:
+    """ETag of the checklist data: the content hash of the cached model"""
+    try:
+        return f'W/"{parser.fingerprint()}"'
+    except OSError:
+        return None
+
 # WebSocket connection manager
+# Messages a client may fall behind by before it is disconnected
+CLIENT_QUEUE_SIZE = 32
+# Seconds a single send may take before the client counts as dead
+SEND_TIMEOUT = 5.0
+
 class ConnectionManager:
+    """Fans messages out to WebSocket clients. Each client has a bounded
+    queue drained by its own sender task, so a slow client only delays
+    itself. Clients whose queue overflows or whose send fails or times out
+    are disconnected; they reconnect and get the whole checklist again"""
+
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.queues: Dict[WebSocket, asyncio.Queue] = {}
+        self.senders: Dict[WebSocket, asyncio.Task] = {}
+        self.messages_sent = 0
+        self.evicted = 0
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.queues)
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.queues[websocket] = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.senders[websocket] = asyncio.create_task(self.send_loop(websocket))
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        """Forget a client and stop its sender; safe to call more than once"""
+        self.queues.pop(websocket, None)
+        sender = self.senders.pop(websocket, None)
+        if sender and sender is not asyncio.current_task():
+            sender.cancel()
 
-    async def broadcast(self, message: dict):
-        """Send message to all connected clients"""
-        for connection in self.active_connections:
+    def evict(self, websocket: WebSocket, reason: str):
+        """Disconnect a slow or dead client and close its socket"""
+        if websocket not in self.queues:
+            return
+        print(f"Dropping WebSocket client: {reason}")
+        self.evicted += 1
+        self.disconnect(websocket)
+        asyncio.create_task(self.close(websocket))
+
+    async def close(self, websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(code=status.WS_1013_TRY_AGAIN_LATER), SEND_TIMEOUT)
+        except Exception:
+            pass
+
+    def enqueue(self, websocket: WebSocket, text: str):
+        queue = self.queues.get(websocket)
+        if queue is None:
+            return
+        try:
+            queue.put_nowait(text)
+        except asyncio.QueueFull:
+            self.evict(websocket, f"more than {CLIENT_QUEUE_SIZE} messages behind")
+
+    async def send_loop(self, websocket: WebSocket):
+        queue = self.queues[websocket]
+        while True:
+            text = await queue.get()
             try:
-                await connection.send_json(message)
-            except:
-                pass
+                await asyncio.wait_for(websocket.send_text(text), SEND_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.evict(websocket, f"send took longer than {SEND_TIMEOUT}s")
+                return
+            except Exception as e:
+                self.evict(websocket, f"send failed: {e!r}")
+                return
+            self.messages_sent += 1
+
+    def send(self, websocket: WebSocket, message: dict):
+        """Queue a message for one client"""
+        self.enqueue(websocket, json.dumps(message))
+
+    async def broadcast(self, message: dict):
+        """Queue a message for all connected clients; it is encoded once"""
+        text = json.dumps(message)
+        for connection in list(self.queues):
+            self.enqueue(connection, text)
+
+    def metrics(self) -> Dict:
+        depths = [queue.qsize() for queue in self.queues.values()]
+        return {
+            "connections": len(depths),
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "queue_size": CLIENT_QUEUE_SIZE,
+            "messages_sent": self.messages_sent,
+            "evicted": self.evicted
+        }
 
 manager = ConnectionManager()
 
@@ -60,18 +153,45 @@ def file_changed():
     if main_loop:
         asyncio.run_coroutine_threadsafe(notify_clients(), main_loop)
 
+# Last checklist state sent to clients: a version bumped with every message,
+# the structure key of the model and each task's completion
+published = {'version': 0, 'structure': None, 'states': {}}
+publish_lock = asyncio.Lock()
+
+def publish(model: Dict):
+    published['version'] += 1
+    published['structure'] = model['structure']
+    published['states'] = {task_id: task['completed'] for task_id, task in model['tasks'].items()}
+
+def full_message(message_type: str, model: Dict) -> Dict:
+    return {
+        "type": message_type,
+        "version": published['version'],
+        "data": model['data'],
+        "stats": model['stats']
+    }
+
 async def notify_clients():
-    """Notify all WebSocket clients of changes"""
+    """Send clients what changed since the last message: {task_id, completed}
+    patches, or the whole checklist if anything but completion changed"""
     try:
-        print("Notifying WebSocket clients...")
-        data = parser.parse_checklist()
-        stats = parser.get_statistics()
-        await manager.broadcast({
-            "type": "update",
-            "data": data,
-            "stats": stats
-        })
-        print(f"Notified {len(manager.active_connections)} clients")
+        async with publish_lock:
+            model = parser.load()
+            if model['structure'] != published['structure']:
+                publish(model)
+                message = full_message("update", model)
+            else:
+                changes = [
+                    {"task_id": task_id, "completed": task['completed']}
+                    for task_id, task in model['tasks'].items()
+                    if published['states'].get(task_id) != task['completed']
+                ]
+                if not changes:
+                    return
+                publish(model)
+                message = {"type": "patch", "version": published['version'], "changes": changes}
+            await manager.broadcast(message)
+        print(f"Sent {message['type']} v{message['version']} to {len(manager.active_connections)} clients")
     except Exception as e:
         print(f"Error notifying clients: {e}")
 
@@ -83,17 +203,23 @@ async def startup_event():
     """Start file watcher on app startup"""
     global watcher, main_loop
     main_loop = asyncio.get_running_loop()
-    watcher = FileWatcher(parser.file_path, file_changed)
+    try:
+        publish(parser.load())
+    except OSError as e:
+        print(f"Could not read {parser.file_path}: {e}")
+    watcher = FileWatcher(parser.file_path, file_changed, invalidate=parser.invalidate)
     watcher.start()
     print(f"File watcher started for: {parser.file_path}")
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Stop file watcher on shutdown"""
+    """Stop file watcher and WebSocket senders on shutdown"""
     global watcher
     if watcher:
         watcher.stop()
         print("File watcher stopped")
+    for connection in manager.active_connections:
+        manager.disconnect(connection)
 
 class ToggleRequest(BaseModel):
     section: str
@@ -102,6 +228,10 @@ class ToggleRequest(BaseModel):
     taskIndex: int
     completed: bool
 
+class TaskToggleRequest(BaseModel):
+    taskId: str
+    completed: bool
+
 class ToggleRoomRequest(BaseModel):
     section: str
     phaseIndex: int
@@ -112,7 +242,7 @@ class ToggleRoomRequest(BaseModel):
 
 @app.get("/")
 def read_root():
-    return {"message": "House Checklist API", "endpoints": ["/house-checklist", "/statistics", "/house-checklist/toggle"]}
+    return {"message": "House Checklist API", "endpoints": ["/house-checklist", "/statistics", "/house-checklist/toggle-task", "/house-checklist/toggle", "/ws/metrics"]}
 
 @app.get("/house-checklist")
 def get_checklist():
@@ -132,146 +262,94 @@ def get_statistics():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/house-checklist/toggle-task")
+def toggle_task_by_id(request: TaskToggleRequest):
+    """Toggle a task's completion status by its id"""
+    try:
+        if not parser.set_task(request.taskId, request.completed):
+            return {"success": False, "message": "Task not found"}
+        
+        # Trigger file watcher notification
+        file_changed()
+        
+        return {"success": True, "message": "Task updated", "completed": request.completed}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/house-checklist/toggle")
 def toggle_task(request: ToggleRequest):
-    """Toggle a task's completion status"""
+    """Toggle a task's completion status by its position in the checklist data"""
     try:
-        # Parse current data to find line number
-        with open(parser.file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        # Parse to get structured data
         data = parser.parse_checklist()
         section_data = data[request.section]
         phase = section_data['phases'][request.phaseIndex]
         
-        # Get the task text to find in file
         if request.subPhaseIndex is not None and 'subPhases' in phase:
             task = phase['subPhases'][request.subPhaseIndex]['tasks'][request.taskIndex]
         else:
             task = phase['tasks'][request.taskIndex]
-        
-        task_text = task['text']
-        
-        # Find and update the line in the file
-        updated = False
-        for i, line in enumerate(lines):
-            if task_text in line and '- [' in line:
-                if request.completed:
-                    lines[i] = line.replace('- [ ]', '- [x]')
-                else:
-                    lines[i] = line.replace('- [x]', '- [ ]').replace('- [X]', '- [ ]')
-                updated = True
-                break
-        
-        if updated:
-            # Write back to file
-            with open(parser.file_path, 'w', encoding='utf-8') as f:
-                f.writelines(lines)
-            
-            # Trigger file watcher notification
-            file_changed()
-            
-            return {"success": True, "message": "Task updated", "completed": request.completed}
-        else:
-            return {"success": False, "message": "Task not found"}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    except (KeyError, IndexError):
+        return {"success": False, "message": "Task not found"}
+    
+    return toggle_task_by_id(TaskToggleRequest(taskId=task['id'], completed=request.completed))
 
 @app.post("/house-checklist/toggle-room")
 def toggle_room_task(request: ToggleRoomRequest):
-    """Toggle a room task's completion status (for painting phase)"""
+    """Toggle a room task's completion status by its position (for painting phase)"""
     try:
-        # Parse current data to find line number
-        with open(parser.file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        # Parse to get structured data
         data = parser.parse_checklist()
-        section_data = data[request.section]
-        phase = section_data['phases'][request.phaseIndex]
-        
-        # Get the room task text to find in file
-        if 'subPhases' in phase:
-            subPhase = phase['subPhases'][request.subPhaseIndex]
-            if 'rooms' in subPhase:
-                room = subPhase['rooms'][request.roomIndex]
-                task = room['tasks'][request.taskIndex]
-                task_text = task['text']
-                
-                # Find and update the line in the file
-                # Need to be more specific since there are multiple tasks with same name
-                # Build a context string to find the exact task
-                room_title = room['title']
-                subphase_title = subPhase['title']
-                
-                updated = False
-                in_correct_room = False
-                in_correct_subphase = False
-                
-                for i, line in enumerate(lines):
-                    # Check if we're in the correct subphase
-                    if f"**{subphase_title}**" in line:
-                        in_correct_subphase = True
-                        in_correct_room = False
-                        continue
-                    # Check if we're in the correct room
-                    if in_correct_subphase and f"**{room_title}**" in line:
-                        in_correct_room = True
-                        continue
-                    # Check if we've moved to a different room or phase
-                    if in_correct_room and '**' in line and room_title not in line:
-                        in_correct_room = False
-                        continue
-                    # Update the task if we're in the correct room
-                    if in_correct_room and task_text in line and '- [' in line:
-                        if request.completed:
-                            lines[i] = line.replace('- [ ]', '- [x]')
-                        else:
-                            lines[i] = line.replace('- [x]', '- [ ]').replace('- [X]', '- [ ]')
-                        updated = True
-                        break
-                
-                if updated:
-                    # Write back to file
-                    with open(parser.file_path, 'w', encoding='utf-8') as f:
-                        f.writelines(lines)
-                    
-                    # Trigger file watcher notification
-                    file_changed()
-                    
-                    return {"success": True, "message": "Room task updated", "completed": request.completed}
-                else:
-                    return {"success": False, "message": "Task not found"}
-            else:
-                return {"success": False, "message": "No rooms found in subphase"}
-        else:
-            return {"success": False, "message": "No subphases found in phase"}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        phase = data[request.section]['phases'][request.phaseIndex]
+    except (KeyError, IndexError):
+        return {"success": False, "message": "Task not found"}
+    
+    if 'subPhases' not in phase:
+        return {"success": False, "message": "No subphases found in phase"}
+    try:
+        subPhase = phase['subPhases'][request.subPhaseIndex]
+        if 'rooms' not in subPhase:
+            return {"success": False, "message": "No rooms found in subphase"}
+        task = subPhase['rooms'][request.roomIndex]['tasks'][request.taskIndex]
+    except IndexError:
+        return {"success": False, "message": "Task not found"}
+    
+    result = toggle_task_by_id(TaskToggleRequest(taskId=task['id'], completed=request.completed))
+    if result["success"]:
+        result["message"] = "Room task updated"
+    return result
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for real-time updates"""
+    """WebSocket endpoint for real-time updates.
+    Clients get the whole checklist on connect, then versioned patches; a
+    client that misses a version sends {"type": "resync"} for the whole
+    checklist again"""
     await manager.connect(websocket)
     try:
-        # Send initial data
-        data = parser.parse_checklist()
-        stats = parser.get_statistics()
-        await websocket.send_json({
-            "type": "initial",
-            "data": data,
-            "stats": stats
-        })
+        # Queue initial data; under the lock so no patch overtakes it
+        async with publish_lock:
+            manager.send(websocket, full_message("initial", parser.load()))
         
         # Keep connection alive
         while True:
-            await websocket.receive_text()
-    except WebSocketDisconnect:
+            message = await websocket.receive_text()
+            try:
+                resync = json.loads(message).get("type") == "resync"
+            except (ValueError, AttributeError):
+                resync = False
+            if resync:
+                async with publish_lock:
+                    manager.send(websocket, full_message("update", parser.load()))
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the socket was closed after eviction
+        pass
+    finally:
         manager.disconnect(websocket)
 
+@app.get("/ws/metrics")
+def get_websocket_metrics():
+    """WebSocket connection count, queue depths, messages sent and evictions"""
+    return manager.metrics()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8003)
\ No newline at end of file
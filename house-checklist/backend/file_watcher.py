@@ -5,43 +5,83 @@ Monitors the House Checklist.md file for changes
 """
 
 import asyncio
+import threading
 from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from datetime import datetime
 
 class ChecklistFileHandler(FileSystemEventHandler):
-    def __init__(self, callback):
+    def __init__(self, callback, invalidate=None):
         self.callback = callback
+        # Called on every change, unlike the debounced callback
+        self.invalidate = invalidate
         self.last_modified = datetime.now()
+        self.pending = None
+        self.lock = threading.Lock()
     
     def on_modified(self, event):
         if event.is_directory:
             return
-        
+        self.file_changed(event.src_path)
+    
+    def on_created(self, event):
+        # Editors that save atomically replace the file instead of modifying it
+        if not event.is_directory:
+            self.file_changed(event.src_path)
+    
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.file_changed(event.dest_path)
+    
+    def file_changed(self, path: str):
         # Check if it's our target file
-        if 'House Checklist.md' in event.src_path:
-            # Debounce rapid changes (within 1 second)
-            now = datetime.now()
-            if (now - self.last_modified).total_seconds() > 1:
-                self.last_modified = now
-                self.callback()
+        if 'House Checklist.md' in path:
+            if self.invalidate:
+                self.invalidate()
+            # Debounce rapid changes (within 1 second). Changes inside the
+            # window are reported once when it ends, so the last one is never lost
+            with self.lock:
+                elapsed = (datetime.now() - self.last_modified).total_seconds()
+                if elapsed <= 1:
+                    if self.pending is None:
+                        self.pending = threading.Timer(1 - elapsed, self.flush)
+                        self.pending.daemon = True
+                        self.pending.start()
+                    return
+                self.last_modified = datetime.now()
+            self.callback()
+    
+    def flush(self):
+        with self.lock:
+            self.pending = None
+            self.last_modified = datetime.now()
+        self.callback()
+    
+    def cancel(self):
+        with self.lock:
+            if self.pending:
+                self.pending.cancel()
+                self.pending = None
 
 class FileWatcher:
-    def __init__(self, file_path: str, callback):
+    def __init__(self, file_path: str, callback, invalidate=None):
         self.file_path = Path(file_path)
         self.callback = callback
+        self.invalidate = invalidate
         self.observer = None
+        self.handler = None
     
     def start(self):
         """Start watching the file's directory"""
-        event_handler = ChecklistFileHandler(self.callback)
+        self.handler = ChecklistFileHandler(self.callback, self.invalidate)
         self.observer = Observer()
-        self.observer.schedule(event_handler, str(self.file_path.parent), recursive=False)
+        self.observer.schedule(self.handler, str(self.file_path.parent), recursive=False)
         self.observer.start()
     
     def stop(self):
         """Stop watching"""
         if self.observer:
             self.observer.stop()
-            self.observer.join()
\ No newline at end of file
+            self.observer.join()
+            self.handler.cancel()
\ No newline at end of file
@@ -4,19 +4,148 @@ House Checklist Parser
 Parses the House Checklist.md file and provides structured data
 """
 
+import hashlib
+import os
 import re
+import threading
+import zlib
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+# A checkbox line: indent and "- [", the state character, then "] " and the text
+CHECKBOX_PATTERN = re.compile(r'^(\s*- \[)([ xX])(\] )(.+)')
+
+def new_counter(**fields) -> Dict:
+    """A statistics entry: task total and completed count (and percentage once calculated)"""
+    return {'total': 0, 'completed': 0, **fields}
+
+def set_percentage(counter: Dict):
+    counter['percentage'] = round((counter['completed'] / counter['total']) * 100, 1) if counter['total'] > 0 else 0
+
+def all_counters(stats: Dict) -> List[Dict]:
+    """Every counter of a statistics tree"""
+    counters = [stats, stats['interior'], stats['exterior']]
+    counters += stats['phases'].values()
+    counters += stats['subPhases'].values()
+    for floor in stats['floors'].values():
+        counters.append(floor)
+        counters += floor['rooms'].values()
+    return counters
 
 class HouseChecklistParser:
     def __init__(self, file_path: str = "/home/sgiese/coding/flatnotes/data/House Checklist.md"):
         self.file_path = Path(file_path)
+        # Parsed model of the file as last read: {"mtime_ns", "size", "hash",
+        # "data", "stats", "tasks" (task id -> task), "counters" (task id ->
+        # stats counters), "structure" (hash of everything but completion)}.
+        # Reads are served from it until invalidate() is called by the file
+        # watcher or after a write
+        self._cache: Optional[Dict] = None
+        self._stale = True
+        self._verify = True
+        self._lock = threading.RLock()
+    
+    def invalidate(self, force: bool = False):
+        """Mark the cached model stale; the next read checks the file again.
+        force re-reads the content even if mtime and size look unchanged
+        (a toggle keeps the size and may land within the same mtime tick)"""
+        self._stale = True
+        if force:
+            self._verify = True
+    
+    def load(self) -> Dict:
+        """The cached model, revalidated against the file if it was invalidated"""
+        with self._lock:
+            if self._stale:
+                self._refresh()
+            return self._cache
+    
+    def _refresh(self):
+        # Cleared first, so an invalidate() arriving during the read is kept
+        self._stale = False
+        verify, self._verify = self._verify, False
+        try:
+            stat = os.stat(self.file_path)
+            cache = self._cache
+            if cache and not verify and cache['mtime_ns'] == stat.st_mtime_ns and cache['size'] == stat.st_size:
+                return
+            with open(self.file_path, 'rb') as f:
+                raw = f.read()
+        except OSError:
+            self._stale = self._verify = True
+            raise
+        
+        content_hash = hashlib.blake2b(raw, digest_size=16).hexdigest()
+        if cache and cache['hash'] == content_hash:
+            # Touched but not edited - keep the parsed model
+            cache['mtime_ns'], cache['size'] = stat.st_mtime_ns, stat.st_size
+            return
+        
+        # Normalise newlines the same way text-mode open() does
+        model = self._parse(raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n'))
+        model.update({
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'hash': content_hash
+        })
+        self._cache = model
+    
+    def fingerprint(self) -> str:
+        """Content hash of the checklist file the cached model was parsed from"""
+        return self.load()['hash']
         
     def parse_checklist(self) -> Dict:
-        """Parse the House Checklist.md file into structured data"""
-        with open(self.file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        """Parse the House Checklist.md file into structured data.
+        Returns the cached model; treat it as read-only"""
+        return self.load()['data']
+    
+    def set_task(self, task_id: str, completed: bool) -> bool:
+        """Check or uncheck a task by id, rewriting only its line.
+        The cached model and statistics are patched in place instead of
+        re-parsed. Returns False if there is no such task"""
+        with self._lock:
+            cache = self.load()
+            task = cache['tasks'].get(task_id)
+            if task is None:
+                return False
+            result = self._apply_updates([{
+                'line_number': task['line'],
+                'completed': completed,
+                'text': task['text']
+            }])
+            if result is None:
+                return False
+            read_hash, lines = result
+            if read_hash != cache['hash']:
+                # The file changed since the model was parsed (the watcher
+                # has not caught up yet); leave the model invalidated so the
+                # next read re-parses it
+                return True
+            
+            if task['completed'] != completed:
+                delta = 1 if completed else -1
+                for counter in cache['counters'][task_id]:
+                    counter['completed'] += delta
+                    set_percentage(counter)
+                task['completed'] = completed
+            # The write invalidated the cache; with the new hash the next
+            # read finds the content matches and keeps the patched model
+            cache['hash'] = hashlib.blake2b(''.join(lines).encode('utf-8'), digest_size=16).hexdigest()
+            return True
+    
+    def parse_content(self, content: str) -> Dict:
+        """Parse checklist markdown into structured data"""
+        return self._parse(content)['data']
+    
+    def _parse(self, content: str) -> Dict:
+        """Parse checklist markdown in a single pass into the cached model:
+        the structured data, its statistics, an index of its tasks by id and
+        the statistics counters each task is counted in.
         
+        Every task records its 1-based source line and an id derived from its
+        section, phase, sub-phase and room titles, its text and how often the
+        same text occurred there before, so ids survive unrelated edits.
+        """
         lines = content.split('\n')
         data = {
             'interior': {
@@ -28,13 +157,67 @@ class HouseChecklistParser:
                 'phases': []
             }
         }
+        stats = new_counter()
+        stats.update({
+            'interior': new_counter(),
+            'exterior': new_counter(),
+            'phases': {},
+            'subPhases': {},
+            'floors': {}
+        })
         
         current_section = None
         current_phase = None
         current_sub_phase = None  # Floor level (Upstairs, Mid Level, Downstairs)
         current_room = None  # Room level (Great Room, Main Hall, etc.)
+        # Statistics counters of the current phase, sub-phase, floor and room
+        phase_stats = sub_phase_stats = floor_stats = room_stats = None
+        # Titles and task ids in document order; equal for documents that
+        # differ only in which tasks are completed
+        structure: List[str] = []
+        tasks: Dict[str, Dict] = {}
+        counters: Dict[str, List[Dict]] = {}
+        occurrences: Dict[str, int] = {}
         
-        for line in lines:
+        def new_task(text: str, completed: bool, line_number: int, *scopes: Dict) -> Dict:
+            """Register a task, counted in the overall and section statistics
+            and the given scopes' counters; without scopes it is not counted"""
+            scope = '/'.join(part['title'] for part in (current_phase, current_sub_phase, current_room) if part)
+            key = f"{current_section}/{scope}/{text}"
+            occurrence = occurrences.get(key, 0)
+            occurrences[key] = occurrence + 1
+            task = {
+                'id': f"{zlib.crc32(f'{occurrence}:{key}'.encode()):08x}",
+                'text': text,
+                'completed': completed,
+                'line': line_number
+            }
+            tasks[task['id']] = task
+            structure.append(task['id'])
+            counters[task['id']] = task_counters = [stats, stats[current_section], *scopes] if scopes else []
+            for counter in task_counters:
+                counter['total'] += 1
+                counter['completed'] += completed
+            return task
+        
+        def drop_tasks(dropped: List[Dict]):
+            """Forget tasks that were parsed but left out of the data"""
+            for task in dropped:
+                del tasks[task['id']]
+                for counter in counters.pop(task['id']):
+                    counter['total'] -= 1
+                    counter['completed'] -= task['completed']
+        
+        def add_sub_phase(title: str, sub_phase: Dict) -> Dict:
+            # Direct phase tasks are dropped once a phase has sub-phases
+            if 'subPhases' not in current_phase:
+                current_phase['subPhases'] = []
+                drop_tasks(current_phase.pop('tasks', None) or [])
+            current_phase['subPhases'].append(sub_phase)
+            structure.append(f"sub:{title}")
+            return stats['subPhases'].setdefault(f"{current_phase['title']} / {title}", new_counter())
+        
+        for line_number, line in enumerate(lines, 1):
             # Skip empty lines and title
             if not line.strip() or line.startswith('# House'):
                 continue
@@ -74,6 +257,8 @@ class HouseChecklistParser:
                         'tasks': []
                     }
                     data[current_section]['phases'].append(current_phase)
+                    phase_stats = stats['phases'][phase_title] = new_counter()
+                    structure.append(f"{current_section}:{phase_title}")
                     current_sub_phase = None
                     current_room = None
                 continue
@@ -93,11 +278,8 @@ class HouseChecklistParser:
                             'title': floor_title,
                             'rooms': []
                         }
-                        # Initialize subPhases if needed
-                        if 'subPhases' not in current_phase:
-                            current_phase['subPhases'] = []
-                            current_phase.pop('tasks', None)
-                        current_phase['subPhases'].append(current_sub_phase)
+                        sub_phase_stats = add_sub_phase(floor_title, current_sub_phase)
+                        floor_stats = stats['floors'].setdefault(floor_title, new_counter(rooms={}))
                         current_room = None
                     # Check if this is a room level
                     elif '**' in task_text and current_sub_phase and indent == 6:  # Room level
@@ -107,24 +289,19 @@ class HouseChecklistParser:
                             'tasks': []
                         }
                         current_sub_phase['rooms'].append(current_room)
+                        room_stats = floor_stats['rooms'].setdefault(room_title, new_counter())
+                        structure.append(f"room:{room_title}")
                     # This is a task level
                     elif current_room and indent == 8:
                         task_text = task_text.replace('**', '')
-                        task = {
-                            'text': task_text,
-                            'completed': completed
-                        }
-                        current_room['tasks'].append(task)
-                    # Fallback for tasks directly under sub-phase
+                        current_room['tasks'].append(new_task(
+                            task_text, completed, line_number, phase_stats, sub_phase_stats, floor_stats, room_stats))
+                    # Fallback for tasks directly under sub-phase (not shown or counted next to rooms)
                     elif current_sub_phase:
                         task_text = task_text.replace('**', '')
-                        task = {
-                            'text': task_text,
-                            'completed': completed
-                        }
                         if 'tasks' not in current_sub_phase:
                             current_sub_phase['tasks'] = []
-                        current_sub_phase['tasks'].append(task)
+                        current_sub_phase['tasks'].append(new_task(task_text, completed, line_number))
                 # Handle non-painting phases
                 elif '**' in task_text:
                     # This is a sub-phase header
@@ -133,120 +310,83 @@ class HouseChecklistParser:
                         'title': sub_phase_title,
                         'tasks': []
                     }
-                    # Initialize subPhases if needed
-                    if 'subPhases' not in current_phase:
-                        current_phase['subPhases'] = []
-                        current_phase.pop('tasks', None)
-                    current_phase['subPhases'].append(current_sub_phase)
+                    sub_phase_stats = add_sub_phase(sub_phase_title, current_sub_phase)
                     current_room = None
                 else:
                     # This is a regular task
                     task_text = task_text.replace('**', '')
                     
-                    task = {
-                        'text': task_text,
-                        'completed': completed
-                    }
-                    
                     # Add task to appropriate location
                     if current_sub_phase and indent > 4:
-                        current_sub_phase['tasks'].append(task)
+                        current_sub_phase['tasks'].append(new_task(
+                            task_text, completed, line_number, phase_stats, sub_phase_stats))
                     elif current_phase:
                         # Direct phase task
                         if 'subPhases' not in current_phase:
                             if 'tasks' not in current_phase:
                                 current_phase['tasks'] = []
-                            current_phase['tasks'].append(task)
+                            current_phase['tasks'].append(new_task(task_text, completed, line_number, phase_stats))
         
-        return data
+        # Calculate percentages
+        for counter in all_counters(stats):
+            set_percentage(counter)
+        
+        return {
+            'data': data,
+            'stats': stats,
+            'tasks': tasks,
+            'counters': counters,
+            'structure': hashlib.blake2b('\n'.join(structure).encode('utf-8'), digest_size=8).hexdigest()
+        }
     
-    def update_file(self, updates: Dict) -> bool:
-        """Update the markdown file with new completion status"""
+    def _apply_updates(self, updates: List[Dict]) -> Optional[Tuple[str, List[str]]]:
+        """Update the markdown file with new completion status.
+        Each update names a checkbox line by its 1-based line_number; with a
+        text, the line must still hold that task. Nothing is written unless
+        every update applies. Returns the content hash of the file as read
+        and the lines written, or None on failure"""
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as f:
+            # newline='' keeps the file's own line endings
+            with open(self.file_path, 'r', encoding='utf-8', newline='') as f:
                 lines = f.readlines()
+            read_hash = hashlib.blake2b(''.join(lines).encode('utf-8'), digest_size=16).hexdigest()
             
             # Process updates
             for update in updates:
                 line_num = update.get('line_number')
                 completed = update.get('completed')
                 
-                if line_num and 0 < line_num <= len(lines):
-                    line = lines[line_num - 1]
-                    if completed:
-                        lines[line_num - 1] = line.replace('- [ ]', '- [x]', 1)
-                    else:
-                        lines[line_num - 1] = line.replace('- [x]', '- [ ]', 1).replace('- [X]', '- [ ]', 1)
-            
-            # Write back to file
-            with open(self.file_path, 'w', encoding='utf-8') as f:
-                f.writelines(lines)
+                match = CHECKBOX_PATTERN.match(lines[line_num - 1]) if line_num and 0 < line_num <= len(lines) else None
+                if not match:
+                    print(f"Error updating file: line {line_num} is not a task")
+                    return None
+                if 'text' in update and match.group(4).strip().replace('**', '') != update['text']:
+                    print(f"Error updating file: line {line_num} no longer holds '{update['text']}'")
+                    return None
+                
+                state = match.group(2)
+                if (state != ' ') != bool(completed):
+                    state = 'x' if completed else ' '
+                line = lines[line_num - 1]
+                lines[line_num - 1] = f"{match.group(1)}{state}{line[match.end(2):]}"
             
-            return True
+            self.write_lines(lines)
+            return read_hash, lines
         except Exception as e:
             print(f"Error updating file: {e}")
-            return False
+            return None
+    
+    def write_lines(self, lines: List[str]):
+        """Write the checklist file and invalidate the cached model"""
+        try:
+            with open(self.file_path, 'w', encoding='utf-8', newline='') as f:
+                f.writelines(lines)
+        finally:
+            self.invalidate(force=True)
     
     def get_statistics(self) -> Dict:
-        """Get statistics about the checklist"""
-        data = self.parse_checklist()
-        
-        stats = {
-            'total': 0,
-            'completed': 0,
-            'interior': {'total': 0, 'completed': 0},
-            'exterior': {'total': 0, 'completed': 0},
-            'phases': {}
-        }
-        
-        for section in ['interior', 'exterior']:
-            for phase in data[section]['phases']:
-                phase_stats = {'total': 0, 'completed': 0}
-                
-                if 'subPhases' in phase:
-                    for sub_phase in phase['subPhases']:
-                        # Check if sub_phase has rooms (for painting phase)
-                        if 'rooms' in sub_phase:
-                            for room in sub_phase['rooms']:
-                                for task in room['tasks']:
-                                    stats['total'] += 1
-                                    stats[section]['total'] += 1
-                                    phase_stats['total'] += 1
-                                    
-                                    if task['completed']:
-                                        stats['completed'] += 1
-                                        stats[section]['completed'] += 1
-                                        phase_stats['completed'] += 1
-                        # Otherwise process tasks directly
-                        elif 'tasks' in sub_phase:
-                            for task in sub_phase['tasks']:
-                                stats['total'] += 1
-                                stats[section]['total'] += 1
-                                phase_stats['total'] += 1
-                                
-                                if task['completed']:
-                                    stats['completed'] += 1
-                                    stats[section]['completed'] += 1
-                                    phase_stats['completed'] += 1
-                elif 'tasks' in phase:
-                    for task in phase['tasks']:
-                        stats['total'] += 1
-                        stats[section]['total'] += 1
-                        phase_stats['total'] += 1
-                        
-                        if task['completed']:
-                            stats['completed'] += 1
-                            stats[section]['completed'] += 1
-                            phase_stats['completed'] += 1
-                
-                stats['phases'][phase['title']] = phase_stats
-        
-        # Calculate percentages
-        stats['percentage'] = round((stats['completed'] / stats['total']) * 100, 1) if stats['total'] > 0 else 0
-        stats['interior']['percentage'] = round((stats['interior']['completed'] / stats['interior']['total']) * 100, 1) if stats['interior']['total'] > 0 else 0
-        stats['exterior']['percentage'] = round((stats['exterior']['completed'] / stats['exterior']['total']) * 100, 1) if stats['exterior']['total'] > 0 else 0
-        
-        return stats
+        """Get statistics about the checklist (cached with the model)"""
+        return self.load()['stats']
 
 if __name__ == "__main__":
     parser = HouseChecklistParser()
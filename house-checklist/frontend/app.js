@@ -6,6 +6,9 @@ let checklistData = null;
 let currentSection = 'interior';
 let socket = null;
 let accordionState = {}; // Store which accordions are open
+let checklistVersion = null; // Version of the last WebSocket message applied
+let tasksById = {}; // Task id -> task object in checklistData, for patches
+let resyncPending = false; // Asked for the whole checklist, patches are dropped until it arrives
 
 // Initialize the app
 document.addEventListener('DOMContentLoaded', () => {
@@ -20,6 +23,7 @@ function setupWebSocket() {
     socket = new WebSocket(WS_URL);
     
     socket.onopen = () => {
+        resyncPending = false; // A new connection starts with the whole checklist
         console.log('WebSocket connected - real-time updates enabled');
     };
     
@@ -27,12 +31,30 @@ function setupWebSocket() {
         const message = JSON.parse(event.data);
         if (message.type === 'update' || message.type === 'initial') {
             checklistData = message.data;
-            saveAccordionState();
-            renderChecklist();
-            restoreAccordionState();
-            updateStatistics();
-            document.getElementById('last-updated').textContent = new Date().toLocaleTimeString();
+            checklistVersion = message.version;
+            resyncPending = false;
+            indexTasks();
+        } else if (message.type === 'patch') {
+            if (resyncPending) return;
+            if (checklistVersion === null || message.version !== checklistVersion + 1) {
+                // Missed a change - ask for the whole checklist again, once
+                resyncPending = true;
+                socket.send(JSON.stringify({ type: 'resync' }));
+                return;
+            }
+            checklistVersion = message.version;
+            message.changes.forEach(change => {
+                const task = tasksById[change.task_id];
+                if (task) task.completed = change.completed;
+            });
+        } else {
+            return;
         }
+        saveAccordionState();
+        renderChecklist();
+        restoreAccordionState();
+        updateStatistics();
+        document.getElementById('last-updated').textContent = new Date().toLocaleTimeString();
     };
     
     socket.onclose = () => {
@@ -46,6 +68,22 @@ function setupWebSocket() {
     };
 }
 
+// Index the tasks of checklistData by id
+function indexTasks() {
+    tasksById = {};
+    ['interior', 'exterior'].forEach(section => {
+        checklistData[section].phases.forEach(phase => {
+            (phase.tasks || []).forEach(task => { tasksById[task.id] = task; });
+            (phase.subPhases || []).forEach(subPhase => {
+                (subPhase.tasks || []).forEach(task => { tasksById[task.id] = task; });
+                (subPhase.rooms || []).forEach(room => {
+                    room.tasks.forEach(task => { tasksById[task.id] = task; });
+                });
+            });
+        });
+    });
+}
+
 // Setup event listeners
 function setupEventListeners() {
     // Tab switching
@@ -113,6 +151,7 @@ async function loadChecklistData() {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
         checklistData = await response.json();
+        indexTasks();
         
         console.log('Loaded checklist data from API:', checklistData);
         renderChecklist();
@@ -592,45 +631,38 @@ function createTaskElementForRoom(task, id, section, phaseIndex, subPhaseIndex,
 
 // Toggle task completion
 async function toggleTask(section, phaseIndex, subPhaseIndex, taskIndex, completed) {
-    // Update local data
-    if (subPhaseIndex !== null) {
-        checklistData[section].phases[phaseIndex].subPhases[subPhaseIndex].tasks[taskIndex].completed = completed;
-    } else {
-        checklistData[section].phases[phaseIndex].tasks[taskIndex].completed = completed;
-    }
-    
-    // Update statistics
-    updateStatistics();
-    
-    // Save to backend (when API is ready)
-    try {
-        await fetch(`${API_URL}/house-checklist/toggle`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ section, phaseIndex, subPhaseIndex, taskIndex, completed })
-        });
-    } catch (error) {
-        console.log('Could not save to backend:', error);
-    }
+    const phase = checklistData[section].phases[phaseIndex];
+    const task = subPhaseIndex !== null
+        ? phase.subPhases[subPhaseIndex].tasks[taskIndex]
+        : phase.tasks[taskIndex];
+    await saveTask(task, completed);
 }
 
 // Toggle room task completion (for painting phase)
 async function toggleRoomTask(section, phaseIndex, subPhaseIndex, roomIndex, taskIndex, completed) {
+    const task = checklistData[section].phases[phaseIndex].subPhases[subPhaseIndex].rooms[roomIndex].tasks[taskIndex];
+    await saveTask(task, completed);
+}
+
+// Update a task locally and save it to the backend by its id
+async function saveTask(task, completed) {
     // Update local data
-    checklistData[section].phases[phaseIndex].subPhases[subPhaseIndex].rooms[roomIndex].tasks[taskIndex].completed = completed;
+    task.completed = completed;
     
     // Update statistics
     updateStatistics();
     
-    // Save to backend (when API is ready)
+    // The built-in sample data has no ids and is not backed by a file
+    if (!task.id) return;
+    
     try {
-        await fetch(`${API_URL}/house-checklist/toggle-room`, {
+        await fetch(`${API_URL}/house-checklist/toggle-task`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ section, phaseIndex, subPhaseIndex, roomIndex, taskIndex, completed })
+            body: JSON.stringify({ taskId: task.id, completed })
         });
     } catch (error) {
-        console.log('Could not save room task to backend:', error);
+        console.log('Could not save to backend:', error);
     }
 }
 
@@ -65,8 +65,9 @@ async def proxy_api(request):
         if key.lower() not in ['host', 'connection', 'content-length']:
             headers[key] = value
     
-    # Make request to backend
-    async with aiohttp.ClientSession() as session:
+    # Make request to backend. Bodies are passed through as they are, so a
+    # gzip-encoded response keeps its Content-Encoding header valid
+    async with aiohttp.ClientSession(auto_decompress=False) as session:
         try:
             async with session.request(
                 method=request.method,
@@ -4,19 +4,42 @@ FastAPI Backend for Todo Dashboard
 Provides REST API endpoints for todo management
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, ORJSONResponse
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 import asyncio
+import base64
+import functools
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime
 import json
+import uuid
+import zlib
+import orjson
 
-from parser import TodoParser
+from parser import TodoParser, DEFAULT_DATA_DIR
+from todo import Todo, TODO_FIELDS
+from file_watcher import FileWatcher
+from store import TodoStore, SORT_NAMES
+from http_cache import ConditionalGetMiddleware
 
-app = FastAPI(title="Todo Dashboard API", version="1.0.0")
+app = FastAPI(title="Todo Dashboard API", version="1.0.0", default_response_class=ORJSONResponse)
+
+# Read endpoints answer 304 Not Modified while the index is unchanged
+app.add_middleware(
+    ConditionalGetMiddleware,
+    current_etag=lambda: data_etag(),
+    paths=["/todos", "/stats", "/files", "/tags", "/kanban", "/calendar"],
+)
+
+# Compress large bodies (the full todo list is hundreds of KB of JSON)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 # Enable CORS for frontend access
 app.add_middleware(
@@ -25,19 +48,231 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
-# Initialize parser
-parser = TodoParser()
+class Vault:
+    """One data directory with its own parser, file watcher, snapshot and
+    index worker.
+    
+    Parsing, snapshot writes and file edits run one at a time on the
+    vault's worker thread; the store is only patched on the event loop, so
+    reads are always served from the last consistent state while a worker
+    is busy, and a long scan of one vault never queues work of another.
+    """
+    
+    def __init__(self, data_dir: str, name: Optional[str] = None, render_html: bool = True):
+        self.parser = TodoParser(data_dir, name=name, render_html=render_html)
+        self.watcher = FileWatcher(self.parser)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"todo-index-{name or 'vault'}")
+        # "warming" while the initial scan runs in the background, then "ready"
+        self.status = "warming"
+        self.ready = asyncio.Event()
+        self.warm_up_task: Optional[asyncio.Task] = None
+        self.refresh_task: Optional[asyncio.Task] = None
+    
+    async def run(self, func, *args):
+        """Run a parser call on the vault's index worker thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args))
+    
+    def contains(self, file_path: str) -> bool:
+        """Whether a file lies inside this vault. Both paths are resolved, so
+        ".." segments and symlinks cannot point outside it"""
+        return Path(file_path).resolve().is_relative_to(self.parser.data_dir.resolve())
+
 
-# Cache for todos
-todos_cache = []
+def configured_vaults() -> List[Vault]:
+    """Vaults from TODO_DATA_DIRS (directories separated by os.pathsep),
+    or the parser's default data directory.
+    
+    With several vaults, relative file names are prefixed with the vault's
+    directory name so files of different vaults never collide.
+    TODO_LAZY_RENDER=1 skips markdown rendering while parsing;
+    formatted_text is then rendered when a response includes it.
+    """
+    render_html = os.environ.get("TODO_LAZY_RENDER") != "1"
+    data_dirs = [d for d in os.environ.get("TODO_DATA_DIRS", "").split(os.pathsep) if d]
+    if not data_dirs:
+        return [Vault(DEFAULT_DATA_DIR, render_html=render_html)]
+    if len(data_dirs) == 1:
+        return [Vault(data_dirs[0], render_html=render_html)]
+    
+    vaults = []
+    names = set()
+    for data_dir in data_dirs:
+        base = name = Path(data_dir).name or "vault"
+        suffix = 2
+        while name in names:
+            name = f"{base}-{suffix}"
+            suffix += 1
+        names.add(name)
+        vaults.append(Vault(data_dir, name=name, render_html=render_html))
+    return vaults
+
+
+vaults = configured_vaults()
+
+# Renders formatted_text left out by lazily rendering parsers
+renderer = vaults[0].parser
+
+# Indexed todos of every vault
+store = TodoStore()
 last_update = None
 
+# "warming" until every vault finished its initial scan, then "ready"
+index_status = "warming"
+
+
+def vault_for(file_path: str) -> Vault:
+    """The vault a todo file belongs to"""
+    for vault in vaults:
+        if vault.contains(file_path):
+            return vault
+    raise HTTPException(status_code=400, detail="File is not in a todo vault")
+
+# Store versions restart at 0; the instance id keeps ETags from an earlier
+# run from matching
+instance_id = uuid.uuid4().hex[:8]
+
+
+def data_etag() -> str:
+    """ETag shared by the read endpoints: the store version plus the /stats
+    inputs that change without a store change"""
+    extra = f"{index_status}|{last_update}|{date.today().isoformat()}"
+    return f'W/"{instance_id}-{store.version}-{zlib.crc32(extra.encode()):08x}"'
+
+# Recent patches applied to the store, so reconnecting WebSocket
+# clients can catch up with a diff
+change_log = deque(maxlen=100)
+
+
+# WebSocket connection manager
+# Messages a client may fall behind by before it is disconnected; below the
+# change log length, so a dropped client can still resume with a diff
+CLIENT_QUEUE_SIZE = 32
+# Seconds a single send may take before the client counts as dead
+SEND_TIMEOUT = 5.0
+
+
+class ConnectionManager:
+    """Fans messages out to WebSocket clients. Each client has a bounded
+    queue drained by its own sender task, so a slow client only delays
+    itself. Clients whose queue overflows or whose send fails or times out
+    are disconnected; they reconnect and resume from their last version"""
+    
+    def __init__(self):
+        self.queues: Dict[WebSocket, asyncio.Queue] = {}
+        self.senders: Dict[WebSocket, asyncio.Task] = {}
+    
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.queues)
+    
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        self.queues[websocket] = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.senders[websocket] = asyncio.create_task(self.send_loop(websocket))
+    
+    def disconnect(self, websocket: WebSocket):
+        """Forget a client and stop its sender; safe to call more than once"""
+        self.queues.pop(websocket, None)
+        sender = self.senders.pop(websocket, None)
+        if sender and sender is not asyncio.current_task():
+            sender.cancel()
+    
+    def evict(self, websocket: WebSocket, reason: str):
+        """Disconnect a slow or dead client and close its socket"""
+        if websocket not in self.queues:
+            return
+        print(f"Dropping WebSocket client: {reason}")
+        self.disconnect(websocket)
+        asyncio.create_task(self.close(websocket))
+    
+    async def close(self, websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(code=status.WS_1013_TRY_AGAIN_LATER), SEND_TIMEOUT)
+        except Exception:
+            pass
+    
+    def enqueue(self, websocket: WebSocket, text: str):
+        queue = self.queues.get(websocket)
+        if queue is None:
+            return
+        try:
+            queue.put_nowait(text)
+        except asyncio.QueueFull:
+            self.evict(websocket, f"more than {CLIENT_QUEUE_SIZE} messages behind")
+    
+    async def send_loop(self, websocket: WebSocket):
+        queue = self.queues[websocket]
+        while True:
+            text = await queue.get()
+            try:
+                await asyncio.wait_for(websocket.send_text(text), SEND_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.evict(websocket, f"send took longer than {SEND_TIMEOUT}s")
+                return
+            except Exception as e:
+                self.evict(websocket, f"send failed: {e!r}")
+                return
+    
+    def send(self, websocket: WebSocket, message: dict):
+        """Queue a message for one client"""
+        self.enqueue(websocket, orjson.dumps(message).decode())
+    
+    async def broadcast(self, message: dict):
+        """Queue a message for all connected clients without waiting for
+        any of them; it is encoded once, not per client"""
+        text = orjson.dumps(message).decode()
+        for connection in list(self.queues):
+            self.enqueue(connection, text)
+
+
+manager = ConnectionManager()
+
+
+class ResponseCache:
+    """Encoded JSON bodies of common responses.
+    
+    Bodies are dropped whenever the store version changes. An entry can
+    carry an extra tag for inputs outside the store (e.g. today's date)
+    and is rebuilt when its tag differs. Keys are a fixed set of names,
+    so the cache stays small.
+    """
+    
+    def __init__(self, store: TodoStore):
+        self.store = store
+        self.version = None
+        self.bodies: Dict[str, tuple] = {}
+    
+    def get(self, name: str, build, tag=None) -> bytes:
+        """Encoded body for name, calling build() for the content on a miss"""
+        if self.version != self.store.version:
+            self.bodies.clear()
+            self.version = self.store.version
+        cached = self.bodies.get(name)
+        if cached is not None and cached[0] == tag:
+            return cached[1]
+        body = orjson.dumps(build())
+        self.bodies[name] = (tag, body)
+        return body
+
+
+response_cache = ResponseCache(store)
+
 
 class TodoToggle(BaseModel):
     file_path: str
     line_number: int
+    id: Optional[str] = None  # Expected todo id on that line
+
+
+class TodoStateChange(BaseModel):
+    file_path: str
+    line_number: int
+    id: Optional[str] = None  # Expected todo id on that line
+    completed: Optional[bool] = None  # Desired state, None toggles
 
 
 class TodoFilter(BaseModel):
@@ -50,15 +285,154 @@ class TodoFilter(BaseModel):
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize todos on startup"""
-    await refresh_todos()
+    """Start the initial scans in the background and start the file watchers.
+    Requests are served right away; /stats reports "warming" until every
+    vault is scanned"""
+    for vault in vaults:
+        vault.watcher.set_refresh_callback(functools.partial(apply_file_changes, vault))
+        await vault.watcher.start()
+        vault.warm_up_task = asyncio.create_task(warm_up(vault))
+
+
+async def warm_up(vault: Vault):
+    """Load the vault's index snapshot and revalidate it; new or changed files
+    are parsed across a process pool off the event loop"""
+    global index_status
+    started = datetime.now()
+    # Vaults warm up side by side; split the cores between their pools
+    workers = max(1, (os.cpu_count() or 1) // len(vaults))
+    try:
+        loaded = await vault.run(vault.parser.load_snapshot)
+        changes = await vault.run(vault.parser.refresh_index_parallel, workers)
+        await apply_changes(await vault.run(vault.parser.indexed_todos))
+        await vault.run(vault.parser.save_snapshot, changes)
+        print(f"{vault.parser.data_dir}: loaded {loaded} files from snapshot, re-parsed {len(changes)}")
+        print(f"{vault.parser.data_dir}: indexed in {(datetime.now() - started).total_seconds():.1f}s, "
+              f"{len(store)} todos in total")
+    except Exception as e:
+        print(f"Error during initial scan of {vault.parser.data_dir}: {e}")
+    finally:
+        vault.status = "ready"
+        vault.ready.set()
+        if all(v.status == "ready" for v in vaults):
+            index_status = "ready"
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the file watchers, the index workers and the WebSocket senders on shutdown"""
+    for vault in vaults:
+        await vault.watcher.stop()
+        vault.executor.shutdown(wait=True)
+    for connection in manager.active_connections:
+        manager.disconnect(connection)
 
 
 async def refresh_todos():
-    """Refresh the todos cache"""
-    global todos_cache, last_update
-    todos_cache = parser.scan_all_todos()
+    """Refresh the todos cache, re-parsing only files that changed.
+    Vaults are rescanned in parallel; concurrent callers share a single
+    in-flight rescan per vault"""
+    global last_update
+    for vault in vaults:
+        if vault.refresh_task is None or vault.refresh_task.done():
+            vault.refresh_task = asyncio.create_task(refresh_vault(vault))
+    # shield: a cancelled request must not cancel the scans other callers wait on
+    await asyncio.shield(asyncio.gather(*(vault.refresh_task for vault in vaults)))
+    last_update = datetime.now().isoformat()
+
+
+async def refresh_vault(vault: Vault):
+    await vault.ready.wait()
+    changes = await vault.run(vault.parser.refresh_index)
+    await apply_changes(changes)
+    await vault.run(vault.parser.save_snapshot, changes)
+
+
+async def apply_file_changes(vault: Vault, paths):
+    """Re-parse only the files reported by a vault's file watcher"""
+    # Changes seen during the initial scan are applied once it finished
+    await vault.ready.wait()
+    changes = await reindex_files(vault, paths)
+    if changes:
+        print(f"Re-indexed {len(changes)} changed file(s)")
+
+
+async def reindex_files(vault: Vault, paths, force: bool = False) -> Dict[str, Optional[List[Todo]]]:
+    """Re-parse the given files on the vault's index worker and apply the changes"""
+    changes = await vault.run(vault.parser.index_files, paths, force)
+    if changes:
+        await apply_changes(changes)
+        await vault.run(vault.parser.save_snapshot, changes)
+    return changes
+
+
+async def apply_changes(changes: Dict[str, Optional[List[Todo]]]):
+    """Patch the store with the changed files and push the diff to clients"""
+    global last_update
+    if not changes:
+        return
+    
+    base_version = store.version
+    patch = store.apply(changes)
     last_update = datetime.now().isoformat()
+    if store.version == base_version:
+        return
+    
+    message = {
+        "type": "patch",
+        "instance": instance_id,
+        "base_version": base_version,
+        "version": store.version,
+        "added": serialize(patch["added"]),
+        "changed": serialize(patch["changed"]),
+        "removed": patch["removed"],
+        "files": patch["files"]
+    }
+    change_log.append(message)
+    await manager.broadcast(message)
+
+
+def encode_cursor(sort: str, key: tuple) -> str:
+    """Opaque pagination cursor: the sort key of the last todo on a page"""
+    return base64.urlsafe_b64encode(json.dumps([sort, list(key)]).encode()).decode()
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    """Decode a cursor from encode_cursor, checking it belongs to this sort"""
+    try:
+        cursor_sort, key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_sort != sort:
+        raise HTTPException(status_code=400, detail="Cursor was created for a different sort")
+    return tuple(key)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma separated field projection (the id is always included)"""
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(',') if f.strip()]
+    unknown = [f for f in names if f not in TODO_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return ['id'] + [f for f in names if f != 'id']
+
+
+def serialize(todos: List[Todo], fields: Optional[List[str]] = None) -> List[Dict]:
+    """Convert todos to their JSON shape, optionally reduced to some fields.
+    formatted_text left out by a lazily rendering parser is rendered here"""
+    results = [todo.to_dict(fields) for todo in todos]
+    if not renderer.render_html and (fields is None or 'formatted_text' in fields):
+        for todo, result in zip(todos, results):
+            if todo.formatted_text is None:
+                result['formatted_text'] = renderer.render_inline(todo.text)
+    return results
+
+
+def json_response(body: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Response for an already encoded JSON body"""
+    return Response(body, media_type="application/json", headers=headers)
 
 
 @app.get("/")
@@ -70,9 +444,11 @@ async def root():
             "todos": "/todos",
             "stats": "/stats",
             "toggle": "/toggle",
+            "toggle_batch": "/toggle/batch",
             "refresh": "/refresh",
             "files": "/files",
-            "tags": "/tags"
+            "tags": "/tags",
+            "ws": "/ws"
         }
     }
 
@@ -85,67 +461,122 @@ async def get_todos(
     priority: Optional[int] = None,
     search: Optional[str] = None,
     sort: Optional[str] = "file",
-    limit: Optional[int] = None
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    fields: Optional[str] = None
 ) -> List[Dict]:
-    """Get all todos with optional filters"""
-    todos = todos_cache.copy()
-    
-    # Apply filters
-    if completed is not None:
-        todos = [t for t in todos if t['completed'] == completed]
-    
-    if tag:
-        todos = [t for t in todos if tag in t['tags']]
-    
-    if file:
-        todos = [t for t in todos if file in t['file']]
-    
-    if priority is not None:
-        todos = [t for t in todos if t['priority'] >= priority]
-    
-    if search:
-        search_lower = search.lower()
-        todos = [t for t in todos if search_lower in t['text'].lower() or search_lower in t['context'].lower()]
+    """Get all todos with optional filters.
     
-    # Sort todos
-    if sort == "priority":
-        todos.sort(key=lambda x: x['priority'], reverse=True)
-    elif sort == "date":
-        todos.sort(key=lambda x: x['due_date'] or '9999-12-31')
-    elif sort == "file":
-        todos.sort(key=lambda x: (x['file'], x['line_number']))
-    elif sort == "recent":
-        todos.sort(key=lambda x: x['created_date'], reverse=True)
+    With `limit`, the X-Next-Cursor response header holds an opaque cursor;
+    pass it back as `after` for the next page. Pages are keyed on the sort
+    key, so they stay consistent while todos change. `fields` is a comma
+    separated list of todo keys to return.
+    """
+    if sort not in SORT_NAMES:
+        sort = "file"
+    if not (completed is not None or tag or file or priority is not None or search or limit or after or fields):
+        # The dashboard's full list - encoded once per store version
+        return json_response(response_cache.get(f"todos:{sort}", lambda: serialize(store.query(sort=sort))))
     
-    # Apply limit
-    if limit:
-        todos = todos[:limit]
+    projection = parse_fields(fields)
+    try:
+        todos, next_key = store.page(
+            completed=completed,
+            tag=tag,
+            file=file,
+            priority=priority,
+            search=search,
+            sort=sort,
+            after=decode_cursor(after, sort) if after else None,
+            limit=limit
+        )
+    except TypeError:
+        # Cursor key does not compare with this sort's keys
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    return todos
+    headers = {"X-Next-Cursor": encode_cursor(sort, next_key)} if next_key is not None else None
+    return json_response(orjson.dumps(serialize(todos, projection)), headers)
 
 
 @app.get("/stats")
 async def get_stats() -> Dict:
     """Get todo statistics"""
-    stats = parser.get_stats(todos_cache)
-    stats['last_update'] = last_update
-    stats['total_files'] = len(set(t['file'] for t in todos_cache))
-    return stats
+    today = date.today().isoformat()
+    
+    def build():
+        stats = store.stats(today)
+        stats['status'] = index_status
+        stats['last_update'] = last_update
+        stats['total_files'] = len(store.by_file)
+        return stats
+    
+    # The overdue count and status fields change without a store change
+    return json_response(response_cache.get("stats", build, tag=(today, index_status, last_update)))
 
 
 @app.post("/toggle")
 async def toggle_todo(todo: TodoToggle) -> Dict:
     """Toggle a todo's completion status"""
-    success = parser.toggle_todo(todo.file_path, todo.line_number)
+    vault = vault_for(todo.file_path)
+    await vault.ready.wait()
+    # Edit, id check and re-index all use the index's own path for the note
+    key = vault.parser.index_key(todo.file_path)
+    if key is None:
+        raise HTTPException(status_code=400, detail="File is not an indexed note")
+    success = await vault.run(vault.parser.toggle_todo, key, todo.line_number, todo.id)
     
     if success:
-        # Refresh cache after toggle
-        await refresh_todos()
+        # Re-parse just the toggled file
+        await reindex_files(vault, [key], force=True)
         return {"success": True, "message": "Todo toggled successfully"}
     else:
         raise HTTPException(status_code=400, detail="Failed to toggle todo")
 
 
+@app.post("/toggle/batch")
+async def toggle_todos(changes: List[TodoStateChange]) -> Dict:
+    """Set the completion status of several todos.
+    
+    Edits are grouped by file; each file is read and written once and then
+    re-parsed once. Every item gets a status: "updated", "unchanged"
+    (already in the desired state), "not_found" (no todo, or not the
+    expected one, on that line) or "error". Files outside every vault or
+    not indexed count as "not_found".
+    """
+    statuses = ["not_found"] * len(changes)
+    by_vault: Dict[int, List[int]] = {}
+    for i, change in enumerate(changes):
+        for v, vault in enumerate(vaults):
+            if vault.contains(change.file_path):
+                by_vault.setdefault(v, []).append(i)
+                break
+    
+    async def apply_to_vault(vault: Vault, indexes: List[int]):
+        await vault.ready.wait()
+        # Items are edited and re-indexed under the index's own path for the note
+        keys = {i: vault.parser.index_key(changes[i].file_path) for i in indexes}
+        indexes = [i for i in indexes if keys[i] is not None]
+        edits = [(keys[i], changes[i].line_number, changes[i].id, changes[i].completed) for i in indexes]
+        vault_statuses = await vault.run(vault.parser.apply_todo_states, edits)
+        for i, status in zip(indexes, vault_statuses):
+            statuses[i] = status
+        
+        updated_files = {keys[i] for i, status in zip(indexes, vault_statuses) if status == "updated"}
+        if updated_files:
+            await reindex_files(vault, updated_files, force=True)
+    
+    # Each vault edits its files on its own worker
+    await asyncio.gather(*(apply_to_vault(vaults[v], indexes) for v, indexes in by_vault.items()))
+    
+    return {
+        "success": all(status in ("updated", "unchanged") for status in statuses),
+        "results": [
+            {"file_path": c.file_path, "line_number": c.line_number, "id": c.id, "status": status}
+            for c, status in zip(changes, statuses)
+        ]
+    }
+
+
 @app.post("/refresh")
 async def refresh() -> Dict:
     """Manually refresh todos from files"""
@@ -153,7 +584,7 @@ async def refresh() -> Dict:
     return {
         "success": True,
         "message": "Todos refreshed",
-        "count": len(todos_cache),
+        "count": len(store),
         "last_update": last_update
     }
 
@@ -161,80 +592,106 @@ async def refresh() -> Dict:
 @app.get("/files")
 async def get_files() -> List[str]:
     """Get list of all files containing todos"""
-    files = list(set(t['file'] for t in todos_cache))
-    files.sort()
-    return files
+    return json_response(response_cache.get("files", store.files))
 
 
 @app.get("/tags")
 async def get_tags() -> List[Dict]:
     """Get all unique tags with counts"""
-    tag_counts = {}
-    for todo in todos_cache:
-        for tag in todo['tags']:
-            if tag not in tag_counts:
-                tag_counts[tag] = 0
-            tag_counts[tag] += 1
+    def build():
+        tags = [{"name": tag, "count": count} for tag, count in store.tag_counts().items()]
+        tags.sort(key=lambda x: x['count'], reverse=True)
+        return tags
     
-    tags = [{"name": tag, "count": count} for tag, count in tag_counts.items()]
-    tags.sort(key=lambda x: x['count'], reverse=True)
-    return tags
+    return json_response(response_cache.get("tags", build))
 
 
 @app.get("/todos/{todo_id}")
 async def get_todo(todo_id: str) -> Dict:
     """Get a specific todo by ID"""
-    for todo in todos_cache:
-        if todo['id'] == todo_id:
-            return todo
+    todo = store.get(todo_id)
+    if todo is not None:
+        return json_response(orjson.dumps(serialize([todo])[0]))
     raise HTTPException(status_code=404, detail="Todo not found")
 
 
 @app.get("/todos/file/{file_name:path}")
 async def get_todos_by_file(file_name: str) -> List[Dict]:
     """Get all todos from a specific file"""
-    todos = [t for t in todos_cache if t['file'] == file_name]
-    todos.sort(key=lambda x: x['line_number'])
-    return todos
+    return json_response(orjson.dumps(serialize(store.file_todos(file_name))))
 
 
 @app.get("/kanban")
 async def get_kanban_data() -> Dict:
     """Get todos organized for Kanban view"""
-    # Simple kanban organization based on priority and status
-    kanban = {
-        "backlog": [],
-        "todo": [],
-        "in_progress": [],
-        "done": []
-    }
-    
-    for todo in todos_cache:
-        if todo['completed']:
-            kanban['done'].append(todo)
-        elif todo['priority'] >= 3:
-            kanban['in_progress'].append(todo)
-        elif todo['priority'] >= 1:
-            kanban['todo'].append(todo)
-        else:
-            kanban['backlog'].append(todo)
+    def build():
+        # Simple kanban organization based on priority and status
+        kanban = {
+            "backlog": [],
+            "todo": [],
+            "in_progress": [],
+            "done": []
+        }
+        
+        kanban['done'] = store.query(completed=True)
+        for todo in store.query(completed=False):
+            if todo.priority >= 3:
+                kanban['in_progress'].append(todo)
+            elif todo.priority >= 1:
+                kanban['todo'].append(todo)
+            else:
+                kanban['backlog'].append(todo)
+        
+        return {column: serialize(todos) for column, todos in kanban.items()}
     
-    return kanban
+    return json_response(response_cache.get("kanban", build))
 
 
 @app.get("/calendar")
 async def get_calendar_data() -> Dict:
     """Get todos organized by due date for calendar view"""
-    calendar = {}
+    def build():
+        return {day: serialize(todos) for day, todos in store.due_dates().items()}
     
-    for todo in todos_cache:
-        if todo['due_date']:
-            date = todo['due_date']
-            if date not in calendar:
-                calendar[date] = []
-            calendar[date].append(todo)
-    
-    return calendar
+    return json_response(response_cache.get("calendar", build))
+
+
+@app.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket, since: Optional[int] = None, instance: Optional[str] = None):
+    """WebSocket endpoint for push updates.
+
+    New clients get a snapshot of all todos with its version, followed by
+    patches of added, changed and removed todos (keyed by id) plus the new
+    created_date of each file whose mtime moved. Clients that
+    reconnect with ?since=<version>&instance=<instance> only get the patches
+    they missed, as long as those are still in the change log. Versions
+    restart with every server process, so a different instance always gets
+    a snapshot.
+    """
+    await manager.connect(websocket)
+    try:
+        resumable = since is not None and instance == instance_id
+        missed = [m for m in change_log if m['version'] > since] if resumable else None
+        if missed is not None and since <= store.version and (
+                since == store.version or (missed and missed[0]['base_version'] == since)):
+            for message in missed:
+                manager.send(websocket, message)
+        else:
+            snapshot = response_cache.get("ws_snapshot", lambda: {
+                "type": "snapshot",
+                "instance": instance_id,
+                "version": store.version,
+                "todos": serialize(store.all())
+            })
+            manager.enqueue(websocket, snapshot.decode())
+        
+        # Keep connection alive
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        manager.disconnect(websocket)
 
 
 if __name__ == "__main__":
@@ -1,82 +1,100 @@
 #!/usr/bin/env python3
 """
 File Watcher for Real-time Updates
-Monitors markdown files for changes and triggers todo refresh
+Monitors markdown files for changes and hands the changed paths to the
+asyncio loop in debounced batches
 """
 
 import asyncio
 from pathlib import Path
+from typing import Optional, Set
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-import time
 
 
 class MarkdownHandler(FileSystemEventHandler):
-    """Handler for markdown file changes"""
-    
+    """Handler for markdown file changes (runs on the watchdog thread)"""
+
     def __init__(self, parser, callback):
         self.parser = parser
-        self.callback = callback
-        self.last_refresh = 0
-        self.refresh_cooldown = 2  # seconds
-    
-    def should_process(self, event):
-        """Check if the event should trigger a refresh"""
-        if event.is_directory:
-            return False
-        
-        path = Path(event.src_path)
-        if path.suffix != '.md':
-            return False
-        
+        self.callback = callback  # Called with the changed path, must be thread-safe
+
+    def should_process(self, path: str, is_directory: bool) -> bool:
+        """Check if a path should trigger a refresh"""
+        path = Path(path)
+
         # Ignore hidden files and flatnotes index
         if path.name.startswith('.') or '.flatnotes' in str(path):
             return False
-        
-        return True
-    
+
+        # Directory moves/deletes affect every note below them
+        if is_directory:
+            return True
+
+        return path.suffix == '.md'
+
+    def queue(self, path: str, is_directory: bool):
+        """Forward a path to the watcher if it is relevant"""
+        if self.should_process(path, is_directory):
+            self.callback(path)
+
     def on_modified(self, event):
         """Handle file modification"""
-        if self.should_process(event):
-            self.trigger_refresh()
-    
+        if not event.is_directory:
+            self.queue(event.src_path, False)
+
     def on_created(self, event):
         """Handle file creation"""
-        if self.should_process(event):
-            self.trigger_refresh()
-    
+        self.queue(event.src_path, event.is_directory)
+
     def on_deleted(self, event):
         """Handle file deletion"""
-        if self.should_process(event):
-            self.trigger_refresh()
-    
-    def trigger_refresh(self):
-        """Trigger a refresh with cooldown to prevent excessive updates"""
-        current_time = time.time()
-        if current_time - self.last_refresh > self.refresh_cooldown:
-            self.last_refresh = current_time
-            asyncio.create_task(self.callback())
+        self.queue(event.src_path, event.is_directory)
+
+    def on_moved(self, event):
+        """Handle file renames - both the old and the new path changed"""
+        self.queue(event.src_path, event.is_directory)
+        self.queue(event.dest_path, event.is_directory)
 
 
 class FileWatcher:
-    """File watcher for monitoring markdown changes"""
-    
-    def __init__(self, parser):
+    """File watcher for monitoring markdown changes.
+
+    Watchdog events are handed to the asyncio loop thread-safely and collected
+    into a set of changed paths. The set is flushed to the refresh callback once
+    no new event arrived for `debounce` seconds (or at the latest `max_delay`
+    seconds after the first event of a burst). Events that arrive while a batch
+    is being processed are kept and flushed afterwards, so trailing changes are
+    never dropped.
+    """
+
+    def __init__(self, parser, debounce: float = 0.3, max_delay: float = 2.0):
         self.parser = parser
+        self.debounce = debounce
+        self.max_delay = max_delay
         self.observer = None
         self.handler = None
         self.refresh_callback = None
-    
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.pending: Set[str] = set()
+        self._burst_started = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._task: Optional[asyncio.Task] = None
+
     def set_refresh_callback(self, callback):
-        """Set the callback function for refreshing todos"""
+        """Set the coroutine called with the set of changed paths"""
         self.refresh_callback = callback
-    
+
     async def start(self):
         """Start watching for file changes"""
         if self.observer is not None:
             return
-        
-        self.handler = MarkdownHandler(self.parser, self.refresh_callback or self.default_callback)
+        if not self.parser.data_dir.is_dir():
+            print(f"Not watching {self.parser.data_dir}: directory does not exist")
+            return
+
+        self.loop = asyncio.get_running_loop()
+        self.handler = MarkdownHandler(self.parser, self.queue_change_threadsafe)
         self.observer = Observer()
         self.observer.schedule(
             self.handler,
@@ -85,41 +103,79 @@ class FileWatcher:
         )
         self.observer.start()
         print(f"Started watching {self.parser.data_dir} for changes")
-    
+
     async def stop(self):
         """Stop watching for file changes"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
         if self.observer is not None:
             self.observer.stop()
             self.observer.join()
             self.observer = None
             print("Stopped file watcher")
-    
-    async def default_callback(self):
+
+    def queue_change_threadsafe(self, path: str):
+        """Entry point for the watchdog thread"""
+        self.loop.call_soon_threadsafe(self.queue_change, path)
+
+    def queue_change(self, path: str):
+        """Record a changed path and (re)arm the debounce timer - loop thread only"""
+        now = self.loop.time()
+        if not self.pending:
+            self._burst_started = now
+        self.pending.add(path)
+
+        if self._timer is not None:
+            self._timer.cancel()
+        # Keep extending the window while events arrive, but not past max_delay
+        delay = min(self.debounce, max(0.0, self._burst_started + self.max_delay - now))
+        self._timer = self.loop.call_later(delay, self._flush)
+
+    def _flush(self):
+        """Debounce window elapsed - process the collected paths"""
+        self._timer = None
+        if self._task is not None and not self._task.done():
+            return  # The running batch picks the new paths up when it finishes
+        self._task = self.loop.create_task(self._drain())
+
+    async def _drain(self):
+        """Hand batches to the callback until no flushed paths are left"""
+        # Paths still inside a debounce window are left for the next flush
+        while self.pending and self._timer is None:
+            paths, self.pending = self.pending, set()
+            try:
+                await (self.refresh_callback or self.default_callback)(paths)
+            except Exception as e:
+                print(f"Error processing file changes: {e}")
+
+    async def default_callback(self, paths: Set[str]):
         """Default callback - just print a message"""
-        print("Files changed, refresh needed")
+        print(f"Files changed, refresh needed: {sorted(paths)}")
 
 
 if __name__ == "__main__":
     # Test the file watcher
     from parser import TodoParser
-    
+
     async def test_watcher():
         parser = TodoParser()
+        parser.scan_all_todos()
         watcher = FileWatcher(parser)
-        
-        async def on_change():
-            print("Change detected! Refreshing todos...")
-            todos = parser.scan_all_todos()
-            print(f"Found {len(todos)} todos")
-        
+
+        async def on_change(paths):
+            print(f"Change detected in {len(paths)} file(s)! Re-parsing them...")
+            changes = parser.index_files(paths)
+            print(f"Updated {len(changes)} file(s), {len(parser.all_todos())} todos total")
+
         watcher.set_refresh_callback(on_change)
         await watcher.start()
-        
+
         print("Watching for changes... Press Ctrl+C to stop")
         try:
             while True:
                 await asyncio.sleep(1)
         except KeyboardInterrupt:
             await watcher.stop()
-    
-    asyncio.run(test_watcher())
\ No newline at end of file
+
+    asyncio.run(test_watcher())
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Conditional GET Support
+Labels read responses with an ETag for the current data version and
+answers matching If-None-Match requests with 304 Not Modified
+"""
+
+from typing import Callable, Iterable, Optional
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/') == opaque for tag in if_none_match.split(','))
+
+
+class ConditionalGetMiddleware(BaseHTTPMiddleware):
+    """ETag / If-None-Match for GET requests below the given path prefixes.
+
+    current_etag() is read before the endpoint runs, so a body is never
+    labelled with a version newer than itself; it may return None when
+    there is no version to offer. Responses carry Cache-Control: no-cache
+    so browsers revalidate every time instead of guessing freshness.
+    """
+
+    def __init__(self, app, current_etag: Callable[[], Optional[str]], paths: Iterable[str]):
+        super().__init__(app)
+        self.current_etag = current_etag
+        self.paths = tuple(paths)
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        if request.method not in ("GET", "HEAD") or not request.url.path.startswith(self.paths):
+            return await call_next(request)
+
+        etag = self.current_etag()
+        if etag is None:
+            return await call_next(request)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+        response = await call_next(request)
+        if response.status_code == 200:
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = "no-cache"
+        return response
@@ -7,16 +7,37 @@ Extracts todos from markdown files and provides metadata
 import os
 import re
 import hashlib
+import functools
+import zlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set, Tuple
 from datetime import datetime
 import json
+import sqlite3
 import mistune
 
+from snapshot import IndexSnapshot
+from todo import Todo
+
+
+# Characters (anywhere) and line starts that mistune may turn into markup.
+# Text without any of them renders to itself, with only quotes escaped
+MARKDOWN_SYNTAX = re.compile(r'[*_`~\[\]<>\\&]|^(?:[#>+=-]|\d+[.)])')
+
+# Rendered todo texts kept across scans
+RENDER_CACHE_SIZE = 4096
+
+DEFAULT_DATA_DIR = "/home/sgiese/coding/flatnotes/data"
 
 class TodoParser:
-    def __init__(self, data_dir: str = "/home/sgiese/coding/flatnotes/data"):
+    def __init__(self, data_dir: str = DEFAULT_DATA_DIR, snapshot_path: Optional[str] = None,
+                 render_html: bool = True, render_cache_size: int = RENDER_CACHE_SIZE,
+                 name: Optional[str] = None):
         self.data_dir = Path(data_dir)
+        # Prefix of relative file names, to tell several data directories apart
+        self.name = name
         self.todo_pattern = re.compile(r'^(\s*)-\s+\[([ xX])\]\s+(.+)$', re.MULTILINE)
         self.heading_pattern = re.compile(r'^(#{1,6})\s+(.+)$', re.MULTILINE)
         self.tag_pattern = re.compile(r'#(\w+(?:-\w+)*)')
@@ -24,46 +45,69 @@ class TodoParser:
         self.priority_pattern = re.compile(r'(?:^|\s)(!{1,3})(?:\s|$)')
         # Initialize mistune markdown renderer for inline formatting only
         self.markdown = mistune.create_markdown(renderer='html', plugins=['strikethrough'])
+        # render_html=False leaves formatted_text as None; callers render on demand
+        self.render_html = render_html
+        self._render_cached = functools.lru_cache(maxsize=render_cache_size)(self._render_markdown)
+        # Per-file index: path -> {"mtime_ns", "size", "hash", "todos"}
+        self.file_index: Dict[str, Dict] = {}
+        # On-disk copy of the index for fast restarts
+        self.snapshot = IndexSnapshot(Path(snapshot_path) if snapshot_path else self.data_dir / ".todo-index", label=name)
         
     def scan_markdown_files(self) -> List[Path]:
         """Recursively find all .md files in data directory"""
         return list(self.data_dir.glob("**/*.md"))
     
-    def generate_todo_id(self, file_path: str, line_number: int, text: str) -> str:
-        """Generate a unique ID for a todo item"""
-        content = f"{file_path}:{line_number}:{text}"
-        return hashlib.md5(content.encode()).hexdigest()[:12]
+    def index_key(self, file_path: str) -> Optional[str]:
+        """The file_index key (the path scan_markdown_files produces) of an
+        indexed note given by any path to it; None if the path is outside the
+        data directory or not an indexed note"""
+        try:
+            relative = Path(file_path).resolve().relative_to(self.data_dir.resolve())
+        except ValueError:
+            return None
+        key = str(self.data_dir / relative)
+        return key if key in self.file_index else None
     
-    def extract_context(self, lines: List[str], line_index: int, context_lines: int = 2) -> str:
-        """Extract surrounding context for a todo"""
-        start = max(0, line_index - context_lines)
-        end = min(len(lines), line_index + context_lines + 1)
-        
-        context_lines = []
-        for i in range(start, end):
-            if i != line_index:  # Skip the todo line itself
-                line = lines[i].strip()
-                if line and not line.startswith('- ['):  # Skip other todos
-                    context_lines.append(line)
-        
-        return ' '.join(context_lines)[:200]  # Limit context length
+    def generate_todo_id(self, file_path: str, text: str, occurrence: int = 0) -> str:
+        """Generate a unique ID for a todo item from its file, its text and how
+        many todos with the same text come before it in the file. Unlike the
+        line number, none of these change when lines are inserted above it"""
+        content = f"{occurrence}:{text}"
+        return f"{zlib.crc32(file_path.encode()):08x}{zlib.crc32(content.encode()):08x}"
+    
+    def render_inline(self, text: str) -> str:
+        """Render todo text as inline HTML.
+        Plain text skips mistune; anything else is cached by text, since the
+        same todos are rendered again on every re-parse of their file"""
+        if not MARKDOWN_SYNTAX.search(text):
+            return text.replace('"', '&quot;')
+        return self._render_cached(text)
+    
+    def _render_markdown(self, text: str) -> str:
+        # Strip any paragraph tags since we're just formatting inline text
+        return self.markdown(text).replace('<p>', '').replace('</p>', '').strip()
     
     def extract_metadata(self, text: str, file_path: Path, line_number: int, context: str) -> Dict:
-        """Extract metadata from todo text and context"""
-        # Extract tags
-        tags = self.tag_pattern.findall(text + ' ' + context)
-        tags = list(set(tags))  # Remove duplicates
+        """Extract metadata from todo text and context.
+        Each pattern only runs if its marker character occurs at all"""
+        # Extract tags (text first, then context)
+        tags = self.tag_pattern.findall(text) if '#' in text else []
+        if '#' in context:
+            tags += self.tag_pattern.findall(context)
+        tags = list(dict.fromkeys(tags))  # Remove duplicates, keeping order stable across processes
         
-        # Extract dates
-        dates = self.date_pattern.findall(text)
-        due_date = dates[0] if dates else None
+        # Extract the first date
+        date_match = self.date_pattern.search(text) if '-' in text else None
+        due_date = date_match.group(1) if date_match else None
         
-        # Extract priority (!, !!, !!!)
-        priority_match = self.priority_pattern.search(text)
-        priority = len(priority_match.group(1)) if priority_match else 0
-        
-        # Clean text (remove priority markers)
-        clean_text = self.priority_pattern.sub('', text).strip()
+        # Extract priority (!, !!, !!!) and clean text (remove priority markers)
+        priority_match = self.priority_pattern.search(text) if '!' in text else None
+        if priority_match:
+            priority = len(priority_match.group(1))
+            clean_text = self.priority_pattern.sub('', text).strip()
+        else:
+            priority = 0
+            clean_text = text.strip()
         
         return {
             "tags": tags,
@@ -73,10 +117,29 @@ class TodoParser:
             "raw_text": text
         }
     
-    def parse_todos(self, content: str, file_path: Path) -> List[Dict]:
-        """Extract todos from markdown content with heading information"""
+    def parse_todos(self, content: str, file_path: Path, mtime: Optional[float] = None) -> List[Todo]:
+        """Extract todos from markdown content with heading information.
+        
+        Lines are classified by their first character: only lines starting
+        with '#' are matched against the heading pattern, and only lines
+        starting with '-' (after indentation) against the todo pattern.
+        Context lines are stripped once however many todos share them, and
+        the file is stat'ed once (not at all if the caller passes its mtime).
+        """
         todos = []
         lines = content.split('\n')
+        line_count = len(lines)
+        
+        # Per-file values, filled in at the first todo
+        path_str = str(file_path)
+        relative_file = None
+        created_date = None
+        
+        # Stripped context line by line index ('' for lines that don't count)
+        context_lines: Dict[int, str] = {}
+        
+        # Todos seen so far per text, for the ids of repeated todos
+        occurrences: Dict[str, int] = {}
         
         # Track current heading
         current_heading = None
@@ -88,133 +151,392 @@ class TodoParser:
         group_start_line = None
         
         for i, line in enumerate(lines):
+            first = line[:1]
+            
             # Check for headings
-            heading_match = self.heading_pattern.match(line)
-            if heading_match:
-                heading_level = len(heading_match.group(1))
-                current_heading = heading_match.group(2).strip()
+            if first == '#':
+                heading_match = self.heading_pattern.match(line)
+                if heading_match:
+                    heading_level = len(heading_match.group(1))
+                    current_heading = heading_match.group(2).strip()
                 continue
             
             # Check for todos
+            if first != '-' and not (first.isspace() and line.lstrip()[:1] == '-'):
+                continue
             match = self.todo_pattern.match(line)
-            if match:
-                indent = len(match.group(1))
-                completed = match.group(2).lower() == 'x'
-                text = match.group(3)
-                
-                # Check if this is part of a contiguous group
-                is_contiguous = (i == last_todo_line + 1)
-                if not is_contiguous:
-                    # Start a new group
-                    group_id = f"{file_path.stem}_{i}"
-                    group_start_line = i + 1
-                
-                last_todo_line = i
-                
-                # Extract context
-                context = self.extract_context(lines, i)
-                
-                # Extract metadata
-                metadata = self.extract_metadata(text, file_path, i + 1, context)
-                
-                # Format text with markdown - render as inline HTML
-                # Strip any paragraph tags since we're just formatting inline text
-                formatted_html = self.markdown(metadata["text"])
-                formatted_text = formatted_html.replace('<p>', '').replace('</p>', '').strip()
-                
-                # Build todo object
-                todo = {
-                    "id": self.generate_todo_id(str(file_path), i + 1, text),
-                    "file": str(file_path.relative_to(self.data_dir)),
-                    "file_path": str(file_path),
-                    "line_number": i + 1,
-                    "indent_level": indent // 2,  # Convert spaces to indent level
-                    "indent_pixels": indent * 10,  # Pixels for CSS indentation
-                    "completed": completed,
-                    "text": metadata["text"],
-                    "formatted_text": formatted_text,
-                    "raw_text": metadata["raw_text"],
-                    "tags": metadata["tags"],
-                    "due_date": metadata["due_date"],
-                    "priority": metadata["priority"],
-                    "context": context,
-                    "created_date": datetime.fromtimestamp(file_path.stat().st_mtime).isoformat(),
-                    "heading": current_heading,
-                    "heading_level": heading_level if current_heading else 0,
-                    "group_id": group_id,
-                    "group_start_line": group_start_line,
-                    "is_contiguous": is_contiguous
-                }
-                
-                todos.append(todo)
+            if not match:
+                continue
+            
+            indent = len(match.group(1))
+            completed = match.group(2).lower() == 'x'
+            text = match.group(3)
+            
+            if created_date is None:
+                relative_file = str(file_path.relative_to(self.data_dir))
+                if self.name:
+                    relative_file = f"{self.name}/{relative_file}"
+                created_date = datetime.fromtimestamp(
+                    file_path.stat().st_mtime if mtime is None else mtime
+                ).isoformat()
+            
+            occurrence = occurrences.get(text, 0)
+            occurrences[text] = occurrence + 1
+            todo_id = self.generate_todo_id(path_str, text, occurrence)
+            
+            # Check if this is part of a contiguous group
+            is_contiguous = (i == last_todo_line + 1)
+            if not is_contiguous:
+                # Start a new group, named after its first todo so it keeps its id too
+                group_id = f"{file_path.stem}_{todo_id}"
+                group_start_line = i + 1
+            
+            last_todo_line = i
+            
+            # Extract context: up to two lines either side, skipping other todos
+            context_parts = []
+            for j in range(max(0, i - 2), min(line_count, i + 3)):
+                if j == i:
+                    continue
+                part = context_lines.get(j)
+                if part is None:
+                    part = lines[j].strip()
+                    if part.startswith('- ['):
+                        part = ''
+                    context_lines[j] = part
+                if part:
+                    context_parts.append(part)
+            context = ' '.join(context_parts)[:200]  # Limit context length
+            
+            # Extract metadata
+            metadata = self.extract_metadata(text, file_path, i + 1, context)
+            
+            # Format text with markdown - render as inline HTML
+            formatted_text = self.render_inline(metadata["text"]) if self.render_html else None
+            
+            # Build todo object
+            todo = Todo(
+                id=todo_id,
+                file=relative_file,
+                file_path=path_str,
+                line_number=i + 1,
+                indent_level=indent // 2,  # Convert spaces to indent level
+                indent_pixels=indent * 10,  # Pixels for CSS indentation
+                completed=completed,
+                text=metadata["text"],
+                formatted_text=formatted_text,
+                raw_text=metadata["raw_text"],
+                tags=metadata["tags"],
+                due_date=metadata["due_date"],
+                priority=metadata["priority"],
+                context=context,
+                created_date=created_date,
+                heading=current_heading,
+                heading_level=heading_level if current_heading else 0,
+                group_id=group_id,
+                group_start_line=group_start_line,
+                is_contiguous=is_contiguous
+            )
+            
+            todos.append(todo)
         
         return todos
     
-    def scan_all_todos(self) -> List[Dict]:
-        """Scan all markdown files and extract todos"""
-        all_todos = []
+    def index_file(self, file_path: Path, force: bool = False) -> bool:
+        """Bring the index entry for a single file up to date.
+        force skips the fingerprint check (mtime may not change on coarse filesystems).
+        Returns True if the file's todos changed (added, modified or removed)"""
+        key = str(file_path)
+        entry = self.file_index.get(key)
+        
+        try:
+            stat = file_path.stat()
+        except FileNotFoundError:
+            return self.file_index.pop(key, None) is not None
+        
+        # Unchanged fingerprint - nothing to do
+        if entry and not force and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            return False
+        
+        self.file_index[key] = self.build_entry(file_path, stat, entry)
+        return True
+    
+    def build_entry(self, file_path: Path, stat: os.stat_result, previous: Optional[Dict] = None) -> Dict:
+        """Read and parse a file into an index entry.
+        Reuses the previous entry's todos if the content hash did not change"""
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        content_hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+        
+        if previous and previous['hash'] == content_hash:
+            # Touched but not edited - skip the parse, only restamp created_date
+            created_date = datetime.fromtimestamp(stat.st_mtime).isoformat()
+            todos = [todo.replace(created_date=created_date) for todo in previous['todos']]
+        else:
+            # Normalise newlines the same way text-mode open() does
+            content = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+            todos = self.parse_todos(content, file_path, stat.st_mtime)
+        
+        return {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "hash": content_hash,
+            "todos": todos
+        }
+    
+    def refresh_index(self) -> Dict[str, Optional[List[Todo]]]:
+        """Re-parse only the files that were added, changed or removed since the last scan.
+        Returns a mapping of file path -> new todos (None for removed files)"""
+        changes = {}
+        seen: Set[str] = set()
         
         for file_path in self.scan_markdown_files():
+            key = str(file_path)
+            seen.add(key)
+            self._reindex(file_path, changes)
+        
+        for key in [k for k in self.file_index if k not in seen]:
+            del self.file_index[key]
+            changes[key] = None
+        
+        return changes
+    
+    def refresh_index_parallel(self, workers: Optional[int] = None, chunk_size: int = 32) -> Dict[str, Optional[List[Todo]]]:
+        """Cold-start variant of refresh_index: new and changed files are read and
+        parsed in chunks across a process pool and merged into the index.
+        Falls back to the serial scan when there is too little work to split"""
+        workers = workers or os.cpu_count() or 1
+        changes = {}
+        stale: List[str] = []
+        seen: Set[str] = set()
+        
+        for file_path in self.scan_markdown_files():
+            key = str(file_path)
+            seen.add(key)
+            entry = self.file_index.get(key)
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                todos = self.parse_todos(content, file_path)
-                all_todos.extend(todos)
-            except Exception as e:
-                print(f"Error parsing {file_path}: {e}")
+                stat = file_path.stat()
+            except FileNotFoundError:
+                continue
+            if not entry or entry['mtime_ns'] != stat.st_mtime_ns or entry['size'] != stat.st_size:
+                stale.append(key)
+        
+        for key in [k for k in self.file_index if k not in seen]:
+            del self.file_index[key]
+            changes[key] = None
+        
+        if workers < 2 or len(stale) < chunk_size * 2:
+            for key in stale:
+                self._reindex(Path(key), changes)
+            return changes
+        
+        chunks = [stale[i:i + chunk_size] for i in range(0, len(stale), chunk_size)]
+        # spawn, not fork: the API process runs an event loop and watchdog threads
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(str(self.data_dir), self.render_html, self.name)
+        ) as pool:
+            for results in pool.map(_parse_chunk, chunks):
+                for key, entry in results:
+                    if entry is None:
+                        if self.file_index.pop(key, None) is not None:
+                            changes[key] = None
+                    else:
+                        self.file_index[key] = entry
+                        changes[key] = entry['todos']
+        
+        return changes
+    
+    def index_files(self, paths, force: bool = False) -> Dict[str, Optional[List[Todo]]]:
+        """Re-parse only the given paths (e.g. from the file watcher).
+        Directory paths cover every indexed or existing note below them.
+        Returns the same change mapping as refresh_index"""
+        changes = {}
         
+        for path in paths:
+            path = Path(path)
+            if path.suffix == '.md' and not path.is_dir():
+                self._reindex(path, changes, force)
+                continue
+            
+            # Directory created, moved or deleted - reconcile everything below it
+            prefix = str(path) + os.sep
+            for key in [k for k in self.file_index if k.startswith(prefix)]:
+                self._reindex(Path(key), changes)
+            if path.is_dir():
+                for file_path in path.glob("**/*.md"):
+                    if str(file_path) not in changes:
+                        self._reindex(file_path, changes)
+        
+        return changes
+    
+    def _reindex(self, file_path: Path, changes: Dict[str, Optional[List[Todo]]], force: bool = False):
+        """Index one file and record it in changes if its todos changed"""
+        key = str(file_path)
+        try:
+            if self.index_file(file_path, force):
+                entry = self.file_index.get(key)
+                changes[key] = entry['todos'] if entry else None
+        except Exception as e:
+            print(f"Error parsing {file_path}: {e}")
+    
+    def load_snapshot(self) -> int:
+        """Seed the index from the on-disk snapshot. The next refresh_index
+        re-parses only files whose mtime/size fingerprint no longer matches.
+        Returns the number of files loaded"""
+        entries = self.snapshot.load()
+        for key, entry in entries.items():
+            if self.render_html:
+                # Snapshot may have been written by a lazily rendering parser
+                for todo in entry['todos']:
+                    if todo.formatted_text is None:
+                        todo.formatted_text = self.render_inline(todo.text)
+            self.file_index.setdefault(key, entry)
+        return len(entries)
+    
+    def save_snapshot(self, changes: Dict[str, Optional[List[Todo]]]):
+        """Write the index entries of changed files to the snapshot"""
+        try:
+            self.snapshot.save({key: self.file_index.get(key) for key in changes})
+        except sqlite3.Error as e:
+            print(f"Error saving index snapshot {self.snapshot.path}: {e}")
+    
+    def indexed_todos(self) -> Dict[str, List[Todo]]:
+        """Todos of every indexed file, keyed by path"""
+        return {key: entry['todos'] for key, entry in self.file_index.items()}
+    
+    def all_todos(self) -> List[Todo]:
+        """Return the todos of every indexed file"""
+        all_todos = []
+        for entry in self.file_index.values():
+            all_todos.extend(entry['todos'])
         return all_todos
     
-    def toggle_todo(self, file_path: str, line_number: int) -> bool:
-        """Toggle a todo's completion status in the markdown file"""
+    def scan_all_todos(self) -> List[Todo]:
+        """Scan all markdown files and extract todos, re-parsing only changed files"""
+        self.refresh_index()
+        return self.all_todos()
+    
+    def toggle_todo(self, file_path: str, line_number: int, todo_id: Optional[str] = None) -> bool:
+        """Toggle a todo's completion status in the markdown file.
+        Only the checkbox byte is rewritten, in place. If todo_id is given the
+        line must still hold that todo, so a stale line number can't flip the
+        wrong item"""
+        return self.set_todo_states(file_path, [(line_number, todo_id, None)])[0] == "updated"
+    
+    def set_todo_states(self, file_path: str, edits: List[Tuple[int, Optional[str], Optional[bool]]]) -> List[str]:
+        """Apply several (line_number, expected id, desired completed) edits to one
+        file in a single read-modify-write; completed None flips the checkbox.
+        Edits apply in order, each seeing the ones before it.
+        Returns a status per edit: "updated", "unchanged", "not_found" or "error"."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            
-            if 0 < line_number <= len(lines):
-                line = lines[line_number - 1]
-                
-                # Toggle between [ ] and [x]
-                if '- [ ]' in line:
-                    lines[line_number - 1] = line.replace('- [ ]', '- [x]', 1)
-                elif '- [x]' in line or '- [X]' in line:
-                    lines[line_number - 1] = line.replace('- [x]', '- [ ]', 1).replace('- [X]', '- [ ]', 1)
-                else:
-                    return False
-                
-                # Write back to file
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.writelines(lines)
+            with open(file_path, 'r+b') as f:
+                # Working copy, patched along with the file
+                data = bytearray(f.read())
                 
-                return True
+                statuses = []
+                for line_number, todo_id, desired in edits:
+                    located = self.locate_checkbox(data, Path(file_path), line_number, todo_id)
+                    if located is None:
+                        statuses.append("not_found")
+                        continue
+                    offset, completed = located
+                    if desired is not None and desired == completed:
+                        statuses.append("unchanged")
+                        continue
+                    
+                    checkbox = b' ' if completed else b'x'
+                    data[offset:offset + 1] = checkbox
+                    f.seek(offset)
+                    f.write(checkbox)
+                    statuses.append("updated")
+            return statuses
         except Exception as e:
-            print(f"Error toggling todo in {file_path}:{line_number} - {e}")
-            return False
+            print(f"Error updating todos in {file_path} - {e}")
+            return ["error"] * len(edits)
+    
+    def apply_todo_states(self, edits: List[Tuple[str, int, Optional[str], Optional[bool]]]) -> List[str]:
+        """Batch variant of set_todo_states over (file_path, line_number, expected id,
+        desired completed) edits: grouped so every file is read and written once.
+        Returns a status per edit, in input order"""
+        by_file: Dict[str, List[int]] = {}
+        for i, edit in enumerate(edits):
+            by_file.setdefault(edit[0], []).append(i)
+        
+        statuses = [""] * len(edits)
+        for file_path, indexes in by_file.items():
+            file_statuses = self.set_todo_states(file_path, [edits[i][1:] for i in indexes])
+            for i, status in zip(indexes, file_statuses):
+                statuses[i] = status
+        return statuses
+    
+    def locate_checkbox(self, data: bytes, file_path: Path, line_number: int,
+                        todo_id: Optional[str] = None) -> Optional[Tuple[int, bool]]:
+        """Find the checkbox of the todo on a line of the raw file contents.
+        Returns (byte offset of the checkbox character, completed), or None if the
+        line is not a todo or is not the expected todo"""
+        if line_number < 1:
+            return None
+        
+        start = 0
+        for _ in range(line_number - 1):
+            start = data.find(b'\n', start) + 1
+            if start == 0:
+                return None
+        end = data.find(b'\n', start)
+        line = data[start:end if end != -1 else len(data)].rstrip(b'\r').decode('utf-8')
+        
+        match = self.todo_pattern.match(line)
+        if not match:
+            return None
+        if todo_id is not None:
+            text = match.group(3)
+            occurrence = self.count_todos_with_text(data, start, text)
+            if todo_id != self.generate_todo_id(str(file_path), text, occurrence):
+                print(f"Todo {todo_id} is no longer on {file_path}:{line_number}")
+                return None
+        
+        offset = start + len(line[:match.start(2)].encode('utf-8'))
+        return offset, match.group(2).lower() == 'x'
+    
+    def count_todos_with_text(self, data: bytes, end: int, text: str) -> int:
+        """Number of todos with exactly this text before byte offset end"""
+        before = data[:end]
+        if text.encode('utf-8') not in before:
+            return 0
+        count = 0
+        for line in before.decode('utf-8').split('\n'):
+            match = self.todo_pattern.match(line.rstrip('\r'))
+            if match and match.group(3) == text:
+                count += 1
+        return count
     
-    def get_stats(self, todos: List[Dict]) -> Dict:
+    def get_stats(self, todos: List[Todo]) -> Dict:
         """Generate statistics from todos"""
+        today = datetime.now().strftime('%Y-%m-%d')
         total = len(todos)
-        completed = sum(1 for t in todos if t['completed'])
+        completed = sum(1 for t in todos if t.completed)
         
         # Group by file
         by_file = {}
         for todo in todos:
-            file = todo['file']
+            file = todo.file
             if file not in by_file:
                 by_file[file] = {"total": 0, "completed": 0}
             by_file[file]["total"] += 1
-            if todo['completed']:
+            if todo.completed:
                 by_file[file]["completed"] += 1
         
         # Group by tag
         by_tag = {}
         for todo in todos:
-            for tag in todo['tags']:
+            for tag in todo.tags:
                 if tag not in by_tag:
                     by_tag[tag] = {"total": 0, "completed": 0}
                 by_tag[tag]["total"] += 1
-                if todo['completed']:
+                if todo.completed:
                     by_tag[tag]["completed"] += 1
         
         return {
@@ -224,11 +546,34 @@ class TodoParser:
             "completion_rate": round(completed / total * 100, 1) if total > 0 else 0,
             "by_file": by_file,
             "by_tag": by_tag,
-            "high_priority": sum(1 for t in todos if t['priority'] >= 2 and not t['completed']),
-            "overdue": sum(1 for t in todos if t['due_date'] and t['due_date'] < datetime.now().strftime('%Y-%m-%d') and not t['completed'])
+            "high_priority": sum(1 for t in todos if t.priority >= 2 and not t.completed),
+            "overdue": sum(1 for t in todos if t.due_date and t.due_date < today and not t.completed)
         }
 
 
+# Parser instance of a process pool worker (see refresh_index_parallel)
+_worker_parser: Optional[TodoParser] = None
+
+
+def _init_worker(data_dir: str, render_html: bool, name: Optional[str]):
+    global _worker_parser
+    _worker_parser = TodoParser(data_dir, render_html=render_html, name=name)
+
+
+def _parse_chunk(paths: List[str]) -> List[Tuple[str, Optional[Dict]]]:
+    """Parse a chunk of files in a worker; None marks a file that vanished"""
+    results = []
+    for path in paths:
+        file_path = Path(path)
+        try:
+            results.append((path, _worker_parser.build_entry(file_path, file_path.stat())))
+        except FileNotFoundError:
+            results.append((path, None))
+        except Exception as e:
+            print(f"Error parsing {file_path}: {e}")
+    return results
+
+
 if __name__ == "__main__":
     # Test the parser
     parser = TodoParser()
@@ -237,8 +582,8 @@ if __name__ == "__main__":
     print(f"Found {len(todos)} todos across all files")
     print("\nSample todos:")
     for todo in todos[:5]:
-        status = "✓" if todo['completed'] else "○"
-        print(f"{status} [{todo['file']}:{todo['line_number']}] {todo['text']}")
+        status = "✓" if todo.completed else "○"
+        print(f"{status} [{todo.file}:{todo.line_number}] {todo.text}")
     
     stats = parser.get_stats(todos)
     print(f"\nStatistics:")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Full-text Search Index for Todos
+Tokenized inverted index over todo text and context with prefix lookup
+and a trigram fallback for substring matches
+"""
+
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set
+
+from todo import Todo
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Matches in the todo text count more than matches in its context
+TEXT_WEIGHT = 3
+CONTEXT_WEIGHT = 1
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def trigrams(token: str) -> Set[str]:
+    """All 3-character substrings of a token"""
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class SearchIndex:
+    """Inverted index token -> {todo id: weight}.
+
+    With substring=True (the default) queries keep the API's substring
+    semantics: every query word may match anywhere inside a token (found via
+    the trigram index) and candidates are verified against the raw text.
+    With substring=False query words only match token prefixes.
+    """
+
+    def __init__(self, substring: bool = True):
+        self.substring = substring
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_tokens: Dict[str, Dict[str, int]] = {}
+        self.docs: Dict[str, Todo] = {}
+        self.trigram_index: Dict[str, Set[str]] = {}
+        self._sorted_tokens: Optional[List[str]] = None
+
+    def add(self, todo: Todo):
+        """Index a todo's text and context"""
+        todo_id = todo.id
+        weights: Dict[str, int] = {}
+        for token in tokenize(todo.text):
+            weights[token] = weights.get(token, 0) + TEXT_WEIGHT
+        for token in tokenize(todo.context):
+            weights[token] = weights.get(token, 0) + CONTEXT_WEIGHT
+
+        self.docs[todo_id] = todo
+        self.doc_tokens[todo_id] = weights
+        for token, weight in weights.items():
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = {}
+                self._add_token(token)
+            posting[todo_id] = weight
+
+    def remove(self, todo: Todo):
+        """Drop a todo from the index"""
+        todo_id = todo.id
+        if self.docs.get(todo_id) is not todo:
+            return
+        del self.docs[todo_id]
+        for token in self.doc_tokens.pop(todo_id, {}):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(todo_id, None)
+            if not posting:
+                del self.postings[token]
+                self._remove_token(token)
+
+    def _add_token(self, token: str):
+        self._sorted_tokens = None
+        for trigram in trigrams(token):
+            self.trigram_index.setdefault(trigram, set()).add(token)
+
+    def _remove_token(self, token: str):
+        self._sorted_tokens = None
+        for trigram in trigrams(token):
+            tokens = self.trigram_index.get(trigram)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self.trigram_index[trigram]
+
+    def prefix_tokens(self, prefix: str) -> List[str]:
+        """Tokens starting with prefix, via binary search over the vocabulary"""
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self.postings)
+        tokens = self._sorted_tokens
+        start = bisect_left(tokens, prefix)
+        end = bisect_left(tokens, prefix + '\U0010ffff', start)
+        return tokens[start:end]
+
+    def matching_tokens(self, term: str) -> List[str]:
+        """Vocabulary tokens a query word matches"""
+        if not self.substring:
+            return self.prefix_tokens(term)
+        if len(term) < 3:
+            return [token for token in self.postings if term in token]
+
+        grams = sorted(trigrams(term), key=lambda g: len(self.trigram_index.get(g, ())))
+        tokens = set(self.trigram_index.get(grams[0], ()))
+        for gram in grams[1:]:
+            tokens &= self.trigram_index.get(gram, set())
+            if not tokens:
+                break
+        return [token for token in tokens if term in token]
+
+    def search(self, query: str, candidates: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Return {todo id: score} for todos matching query, optionally
+        restricted to a candidate id set"""
+        query_lower = query.lower()
+        terms = tokenize(query_lower)
+        if candidates is not None and not isinstance(candidates, (set, dict)):
+            candidates = set(candidates)
+
+        if not terms:
+            # Nothing indexable (punctuation only) - fall back to a scan
+            ids = self.docs.keys() if candidates is None else candidates
+            return {i: 1.0 for i in ids if self._verify(i, query_lower)}
+
+        scores: Optional[Dict[str, float]] = None
+        for term in terms:
+            term_scores: Dict[str, float] = {}
+            for token in self.matching_tokens(term):
+                # Whole-word matches rank above prefix matches above infix matches
+                quality = 3 if token == term else 2 if token.startswith(term) else 1
+                for todo_id, weight in self.postings[token].items():
+                    score = weight * quality
+                    if score > term_scores.get(todo_id, 0):
+                        term_scores[todo_id] = score
+
+            if scores is None:
+                if candidates is not None:
+                    term_scores = {i: s for i, s in term_scores.items() if i in candidates}
+                scores = term_scores
+            else:
+                scores = {i: s + term_scores[i] for i, s in scores.items() if i in term_scores}
+            if not scores:
+                return {}
+
+        if not self.substring:
+            return scores
+
+        # Words matched individually; keep only todos containing the whole query
+        return {i: s for i, s in scores.items() if self._verify(i, query_lower)}
+
+    def _verify(self, todo_id: str, query_lower: str) -> bool:
+        todo = self.docs[todo_id]
+        return query_lower in todo.text.lower() or query_lower in todo.context.lower()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Persistent Todo Index Snapshot
+Stores the parser's per-file index (fingerprint + parsed todos) in a
+small sqlite database so restarts only re-parse files that changed
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, Optional
+
+from todo import Todo
+
+# Bump whenever the shape of parsed todos changes so old snapshots are dropped
+SNAPSHOT_FORMAT = 2
+
+
+class IndexSnapshot:
+    """sqlite-backed copy of TodoParser.file_index, one row per file.
+    label (the parser's name) is stored with the format, since it is part
+    of every todo's relative file name"""
+
+    def __init__(self, path: Path, label: Optional[str] = None):
+        self.path = Path(path)
+        self.format = f"{SNAPSHOT_FORMAT}/{label}" if label else str(SNAPSHOT_FORMAT)
+        self.connection: Optional[sqlite3.Connection] = None
+
+    def open(self) -> sqlite3.Connection:
+        if self.connection is None:
+            # Used from the API's index worker thread, never concurrently
+            self.connection = sqlite3.connect(str(self.path), check_same_thread=False)
+            self.connection.executescript('''
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    hash TEXT NOT NULL,
+                    todos TEXT NOT NULL
+                );
+            ''')
+            row = self.connection.execute("SELECT value FROM meta WHERE key = 'format'").fetchone()
+            if row is None or row[0] != self.format:
+                with self.connection:
+                    self.connection.execute("DELETE FROM files")
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('format', ?)",
+                        (self.format,)
+                    )
+        return self.connection
+
+    def load(self) -> Dict[str, Dict]:
+        """Read every stored index entry"""
+        entries = {}
+        try:
+            rows = self.open().execute("SELECT path, mtime_ns, size, hash, todos FROM files")
+            for path, mtime_ns, size, content_hash, todos in rows:
+                entries[path] = {
+                    "mtime_ns": mtime_ns,
+                    "size": size,
+                    "hash": content_hash,
+                    "todos": [Todo.from_dict(todo) for todo in json.loads(todos)]
+                }
+        except (sqlite3.DatabaseError, ValueError, TypeError) as e:
+            print(f"Ignoring unreadable index snapshot {self.path}: {e}")
+            return {}
+        return entries
+
+    def save(self, entries: Dict[str, Optional[Dict]]):
+        """Upsert changed entries; None deletes the file's row"""
+        if not entries:
+            return
+        connection = self.open()
+        with connection:
+            for path, entry in entries.items():
+                if entry is None:
+                    connection.execute("DELETE FROM files WHERE path = ?", (path,))
+                else:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO files (path, mtime_ns, size, hash, todos) VALUES (?, ?, ?, ?, ?)",
+                        (path, entry['mtime_ns'], entry['size'], entry['hash'],
+                         json.dumps([todo.to_dict() for todo in entry['todos']], separators=(',', ':')))
+                    )
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
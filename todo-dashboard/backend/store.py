@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+In-memory Todo Store
+Holds the parsed todos with secondary indexes so API queries intersect
+posting sets instead of rescanning and re-sorting every todo
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from search import SearchIndex
+from todo import Todo
+
+
+# Sorts after every real due date
+NO_DUE_DATE = '\uffff'
+
+
+def _newest_first(created_date: str) -> float:
+    """Sort key putting later created dates first"""
+    return -datetime.fromisoformat(created_date).timestamp()
+
+
+# Presorted orderings: sort name -> key function; all ascending, ties in
+# file then line order
+SORT_ORDERS: Dict[str, Callable[[Todo], Tuple]] = {
+    "file": lambda t: (t.file, t.line_number, t.id),
+    "priority": lambda t: (-t.priority, t.file, t.line_number, t.id),
+    "date": lambda t: (t.due_date or NO_DUE_DATE, t.file, t.line_number, t.id),
+    "recent": lambda t: (_newest_first(t.created_date), t.file, t.line_number, t.id),
+}
+
+# Orderings kept by the store: the sort orders plus the due dates of pending
+# todos for overdue counts (key None = not part of the ordering)
+ORDERING_KEYS: Dict[str, Callable[[Todo], Optional[Tuple]]] = {
+    **SORT_ORDERS,
+    "pending_due": lambda t: (t.due_date, t.id) if t.due_date and not t.completed else None,
+}
+
+# Valid sort names; "relevance" only applies to search queries
+SORT_NAMES = tuple(SORT_ORDERS) + ("relevance",)
+
+# Above this many ordering updates in one batch, re-sort instead of insorting
+BULK_REBUILD_THRESHOLD = 1000
+
+
+class TodoStore:
+    """Todos indexed by id, file, tag, completion and priority.
+
+    Todos are replaced a file at a time with apply(), which patches every
+    index and ordering incrementally and returns the id-keyed diff.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.by_id: Dict[str, Todo] = {}
+        self.by_path: Dict[str, List[Todo]] = {}    # absolute path -> todos in line order
+        self.by_file: Dict[str, List[Todo]] = {}    # relative file -> todos in line order
+        self.by_tag: Dict[str, Set[str]] = {}
+        self.by_completed: Dict[bool, Set[str]] = {True: set(), False: set()}
+        self.by_priority: Dict[int, Set[str]] = {}
+        self.orderings: Dict[str, List[Tuple]] = {name: [] for name in ORDERING_KEYS}
+        self._orderings_dirty = False
+        self.search_index = SearchIndex()
+
+        # Aggregates, kept in step with the indexes
+        self.file_stats: Dict[str, Dict[str, int]] = {}
+        self.tag_completed: Dict[str, int] = {}
+        self.high_priority = 0
+        self._files_sorted: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def apply(self, changes: Dict[str, Optional[List[Todo]]]) -> Dict:
+        """Replace the todos of each changed file (None removes the file).
+        Returns the diff as {"added": [...], "changed": [...], "removed": [ids],
+        "files": {file_path: created_date}}. created_date belongs to the file:
+        a todo that only got a new created_date is not "changed", the file's
+        new date is listed once under "files" instead"""
+        patch = {"added": [], "changed": [], "removed": [], "files": {}}
+        removed: List[Todo] = []
+        inserted: List[Todo] = []
+
+        for path, todos in changes.items():
+            old = self.by_path.get(path, [])
+            old_by_id = {t.id: t for t in old}
+            new_by_id = {t.id: t for t in (todos or [])}
+
+            for todo_id, todo in old_by_id.items():
+                if todo_id not in new_by_id:
+                    patch["removed"].append(todo_id)
+                    removed.append(todo)
+            for todo_id, todo in new_by_id.items():
+                previous = old_by_id.get(todo_id)
+                if previous is None:
+                    patch["added"].append(todo)
+                    inserted.append(todo)
+                elif previous != todo:
+                    if not previous.same_content(todo):
+                        patch["changed"].append(todo)
+                    removed.append(previous)
+                    inserted.append(todo)
+
+            if old:
+                old_file = old[0].file
+                if self.by_file.get(old_file) is old:
+                    del self.by_file[old_file]
+                    del self.file_stats[old_file]
+                    self._files_sorted = None
+            if old and todos and old[0].created_date != todos[0].created_date:
+                patch["files"][todos[0].file_path] = todos[0].created_date
+            if todos:
+                new_file = todos[0].file
+                if new_file not in self.by_file:
+                    self._files_sorted = None
+                self.by_path[path] = todos
+                self.by_file[new_file] = todos
+                self.file_stats[new_file] = {
+                    "total": len(todos),
+                    "completed": sum(1 for t in todos if t.completed)
+                }
+            else:
+                self.by_path.pop(path, None)
+
+        for todo in removed:
+            self._unindex(todo)
+        for todo in inserted:
+            self._index(todo)
+        self._update_orderings(removed, inserted)
+
+        if removed or inserted:
+            self.version += 1
+        return patch
+
+    def _index(self, todo: Todo):
+        todo_id = todo.id
+        self.by_id[todo_id] = todo
+        for tag in todo.tags:
+            self.by_tag.setdefault(tag, set()).add(todo_id)
+            if todo.completed:
+                self.tag_completed[tag] = self.tag_completed.get(tag, 0) + 1
+        self.by_completed[todo.completed].add(todo_id)
+        self.by_priority.setdefault(todo.priority, set()).add(todo_id)
+        if todo.priority >= 2 and not todo.completed:
+            self.high_priority += 1
+        self.search_index.add(todo)
+
+    def _unindex(self, todo: Todo):
+        todo_id = todo.id
+        if self.by_id.get(todo_id) is todo:
+            del self.by_id[todo_id]
+        for tag in todo.tags:
+            ids = self.by_tag.get(tag)
+            if ids is not None:
+                ids.discard(todo_id)
+                if not ids:
+                    del self.by_tag[tag]
+            if todo.completed:
+                self.tag_completed[tag] -= 1
+                if not self.tag_completed[tag]:
+                    del self.tag_completed[tag]
+        if todo.priority >= 2 and not todo.completed:
+            self.high_priority -= 1
+        self.by_completed[todo.completed].discard(todo_id)
+        ids = self.by_priority.get(todo.priority)
+        if ids is not None:
+            ids.discard(todo_id)
+            if not ids:
+                del self.by_priority[todo.priority]
+        self.search_index.remove(todo)
+
+    def _update_orderings(self, removed: List[Todo], inserted: List[Todo]):
+        """Keep the presorted orderings in step with the indexes"""
+        if self._orderings_dirty:
+            return
+        if len(removed) + len(inserted) > BULK_REBUILD_THRESHOLD:
+            # Cheaper to re-sort once, lazily on the next query
+            self._orderings_dirty = True
+            return
+
+        for name, key in ORDERING_KEYS.items():
+            ordering = self.orderings[name]
+            for todo in removed:
+                k = key(todo)
+                if k is None:
+                    continue
+                i = bisect_left(ordering, k)
+                if i < len(ordering) and ordering[i] == k:
+                    del ordering[i]
+            for todo in inserted:
+                k = key(todo)
+                if k is not None:
+                    insort(ordering, k)
+
+    def _ordering(self, name: str) -> List[Tuple]:
+        if self._orderings_dirty:
+            todos = self.by_id.values()
+            for ordering_name, key in ORDERING_KEYS.items():
+                keys = (key(t) for t in todos)
+                self.orderings[ordering_name] = sorted(k for k in keys if k is not None)
+            self._orderings_dirty = False
+        return self.orderings[name]
+
+    def all(self) -> List[Todo]:
+        """All todos in file order"""
+        return [self.by_id[k[-1]] for k in self._ordering("file")]
+
+    def get(self, todo_id: str) -> Optional[Todo]:
+        """Look up a todo by id"""
+        return self.by_id.get(todo_id)
+
+    def file_todos(self, file: str) -> List[Todo]:
+        """Todos of one file (relative path) in line order"""
+        return list(self.by_file.get(file, []))
+
+    def files(self) -> List[str]:
+        """Sorted list of files containing todos"""
+        if self._files_sorted is None:
+            self._files_sorted = sorted(self.by_file)
+        return list(self._files_sorted)
+
+    def tag_counts(self) -> Dict[str, int]:
+        """Number of todos per tag"""
+        return {tag: len(ids) for tag, ids in self.by_tag.items()}
+
+    def overdue_count(self, today: Optional[str] = None) -> int:
+        """Pending todos due before today (YYYY-MM-DD)"""
+        today = today or date.today().isoformat()
+        return bisect_left(self._ordering("pending_due"), (today,))
+
+    def due_dates(self) -> Dict[str, List[Todo]]:
+        """Todos with a due date grouped by date, in date then file order"""
+        calendar: Dict[str, List[Todo]] = {}
+        ordering = self._ordering("date")
+        for key in islice(ordering, bisect_left(ordering, (NO_DUE_DATE,))):
+            calendar.setdefault(key[0], []).append(self.by_id[key[-1]])
+        return calendar
+
+    def stats(self, today: Optional[str] = None) -> Dict:
+        """Statistics from the maintained aggregates, same shape as
+        TodoParser.get_stats"""
+        total = len(self.by_id)
+        completed = len(self.by_completed[True])
+        return {
+            "total": total,
+            "completed": completed,
+            "pending": total - completed,
+            "completion_rate": round(completed / total * 100, 1) if total > 0 else 0,
+            "by_file": {file: dict(counts) for file, counts in self.file_stats.items()},
+            "by_tag": {
+                tag: {"total": len(ids), "completed": self.tag_completed.get(tag, 0)}
+                for tag, ids in self.by_tag.items()
+            },
+            "high_priority": self.high_priority,
+            "overdue": self.overdue_count(today)
+        }
+
+    def query(
+        self,
+        completed: Optional[bool] = None,
+        tag: Optional[str] = None,
+        file: Optional[str] = None,
+        priority: Optional[int] = None,
+        search: Optional[str] = None,
+        sort: Optional[str] = "file",
+        after: Optional[Tuple] = None,
+        limit: Optional[int] = None
+    ) -> List[Todo]:
+        """Filter todos by intersecting index posting sets, then order them"""
+        return self.page(completed, tag, file, priority, search, sort, after, limit)[0]
+
+    def page(
+        self,
+        completed: Optional[bool] = None,
+        tag: Optional[str] = None,
+        file: Optional[str] = None,
+        priority: Optional[int] = None,
+        search: Optional[str] = None,
+        sort: Optional[str] = "file",
+        after: Optional[Tuple] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[List[Todo], Optional[Tuple]]:
+        """Like query(), but keyset-paginated: returns up to limit todos whose
+        sort key comes after the `after` key, plus the key to continue from
+        (None on the last page). sort="relevance" ranks search matches by score"""
+        postings: List[Set[str]] = []
+
+        if completed is not None:
+            postings.append(self.by_completed[completed])
+
+        if tag:
+            postings.append(self.by_tag.get(tag, set()))
+
+        if file:
+            # Substring match on the file name, resolved against the file index
+            postings.append({t.id for name, todos in self.by_file.items() if file in name for t in todos})
+
+        if priority is not None:
+            postings.append(set().union(*(ids for p, ids in self.by_priority.items() if p >= priority)))
+
+        ids: Optional[Set[str]] = None
+        if postings:
+            postings.sort(key=len)
+            ids = set(postings[0])
+            for posting in postings[1:]:
+                ids &= posting
+                if not ids:
+                    break
+
+        if search:
+            scores = self.search_index.search(search, ids)
+            if sort == "relevance":
+                file_key = SORT_ORDERS["file"]
+                keys = sorted((-scores[i],) + file_key(self.by_id[i]) for i in scores)
+                return self._page(keys, after, limit)
+            ids = set(scores)
+
+        if sort not in SORT_ORDERS:
+            sort = "file"
+        key = SORT_ORDERS[sort]
+
+        if ids is None:
+            return self._page(self._ordering(sort), after, limit)
+
+        # Small result sets: sort them directly; large ones: walk the presorted ordering
+        if len(ids) * 8 < len(self.by_id):
+            return self._page(sorted(key(self.by_id[i]) for i in ids), after, limit)
+        return self._page(self._ordering(sort), after, limit, ids)
+
+    def _page(
+        self,
+        keys: List[Tuple],
+        after: Optional[Tuple],
+        limit: Optional[int],
+        member: Optional[Set[str]] = None
+    ) -> Tuple[List[Todo], Optional[Tuple]]:
+        """Walk ascending sort keys starting after a cursor key, optionally
+        keeping only ids in member"""
+        start = bisect_right(keys, after) if after is not None else 0
+        walk = islice(keys, start, None)
+        if member is not None:
+            walk = (k for k in walk if k[-1] in member)
+
+        # No limit, or a zero or negative one: everything from the cursor on
+        if limit is None or limit <= 0:
+            return [self.by_id[k[-1]] for k in walk], None
+
+        selected = list(islice(walk, limit + 1))
+        next_key = selected[limit - 1] if len(selected) > limit else None
+        return [self.by_id[k[-1]] for k in selected[:limit]], next_key
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Compact Todo Record
+Parsed todos are kept as __slots__ records with interned shared strings
+and only turned into the API's JSON dict shape at the response boundary
+"""
+
+import sys
+from operator import attrgetter
+from typing import Dict, Iterable, Optional
+
+# Keys of every todo in the API's JSON shape
+TODO_FIELDS = (
+    "id", "file", "file_path", "line_number", "indent_level", "indent_pixels",
+    "completed", "text", "formatted_text", "raw_text", "tags", "due_date",
+    "priority", "context", "created_date", "heading", "heading_level",
+    "group_id", "group_start_line", "is_contiguous"
+)
+
+_values = attrgetter(*TODO_FIELDS)
+# created_date is the file's mtime, shared by every todo in the file
+_content = attrgetter(*(name for name in TODO_FIELDS if name != "created_date"))
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+class Todo:
+    """One parsed todo; attribute names match the JSON keys.
+
+    Strings that repeat across many todos (paths, headings, dates, tags) are
+    interned, and text/raw_text/formatted_text share one string when equal,
+    so todos loaded from the snapshot or a worker process don't each carry
+    their own copies. tags is a tuple.
+    """
+
+    __slots__ = TODO_FIELDS
+
+    def __init__(self, id, file, file_path, line_number, indent_level, indent_pixels,
+                 completed, text, formatted_text, raw_text, tags, due_date, priority,
+                 context, created_date, heading, heading_level, group_id,
+                 group_start_line, is_contiguous):
+        self.id = id
+        self.file = sys.intern(file)
+        self.file_path = sys.intern(file_path)
+        self.line_number = line_number
+        self.indent_level = indent_level
+        self.indent_pixels = indent_pixels
+        self.completed = completed
+        self.text = text
+        self.formatted_text = text if formatted_text == text else formatted_text
+        self.raw_text = text if raw_text == text else raw_text
+        self.tags = tuple(map(sys.intern, tags))
+        self.due_date = _intern(due_date)
+        self.priority = priority
+        self.context = context
+        self.created_date = sys.intern(created_date)
+        self.heading = _intern(heading)
+        self.heading_level = heading_level
+        self.group_id = group_id
+        self.group_start_line = group_start_line
+        self.is_contiguous = is_contiguous
+
+    @classmethod
+    def from_dict(cls, todo: Dict) -> "Todo":
+        """Build a record from the JSON shape"""
+        return cls(**todo)
+
+    def to_dict(self, fields: Optional[Iterable[str]] = None) -> Dict:
+        """The todo in the API's JSON shape, optionally reduced to some fields"""
+        if fields is None:
+            todo = dict(zip(TODO_FIELDS, _values(self)))
+        else:
+            todo = {name: getattr(self, name) for name in fields}
+        if 'tags' in todo:
+            todo['tags'] = list(self.tags)
+        return todo
+
+    def replace(self, **changes) -> "Todo":
+        """Copy of the todo with some fields changed"""
+        todo = dict(zip(TODO_FIELDS, _values(self)))
+        todo.update(changes)
+        return Todo(**todo)
+
+    def __eq__(self, other):
+        if not isinstance(other, Todo):
+            return NotImplemented
+        return _values(self) == _values(other)
+
+    __hash__ = None
+
+    def same_content(self, other: "Todo") -> bool:
+        """Equal apart from created_date"""
+        return _content(self) == _content(other)
+
+    def __reduce__(self):
+        # Positional values instead of a per-object state dict, so records
+        # pickle small and are re-interned in the receiving process
+        return Todo, _values(self)
+
+    def __repr__(self) -> str:
+        return f"Todo({self.id!r}, {self.file!r}:{self.line_number})"
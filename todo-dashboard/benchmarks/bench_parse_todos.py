@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Parser Microbenchmark
+Times TodoParser.parse_todos against the previous line-by-line
+implementation on generated notes and checks both produce the same todos
+
+Usage: python bench_parse_todos.py [--notes N] [--repeat N]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from parser import TodoParser  # noqa: E402
+from vault_generator import generate_note  # noqa: E402
+
+
+class LegacyTodoParser(TodoParser):
+    """parse_todos as it was before the single-pass scanner, kept for comparison.
+    Only the id scheme follows the current parser, so outputs stay comparable"""
+
+    def extract_context(self, lines: List[str], line_index: int, context_lines: int = 2) -> str:
+        start = max(0, line_index - context_lines)
+        end = min(len(lines), line_index + context_lines + 1)
+
+        context_lines = []
+        for i in range(start, end):
+            if i != line_index:
+                line = lines[i].strip()
+                if line and not line.startswith('- ['):
+                    context_lines.append(line)
+
+        return ' '.join(context_lines)[:200]
+
+    def extract_metadata(self, text: str, file_path: Path, line_number: int, context: str) -> Dict:
+        tags = self.tag_pattern.findall(text + ' ' + context)
+        tags = list(dict.fromkeys(tags))
+
+        dates = self.date_pattern.findall(text)
+        due_date = dates[0] if dates else None
+
+        priority_match = self.priority_pattern.search(text)
+        priority = len(priority_match.group(1)) if priority_match else 0
+
+        clean_text = self.priority_pattern.sub('', text).strip()
+
+        return {
+            "tags": tags,
+            "due_date": due_date,
+            "priority": priority,
+            "text": clean_text,
+            "raw_text": text
+        }
+
+    def parse_todos(self, content: str, file_path: Path, mtime=None) -> List[Dict]:
+        todos = []
+        lines = content.split('\n')
+
+        current_heading = None
+        heading_level = 0
+
+        last_todo_line = -999
+        group_id = None
+        group_start_line = None
+        occurrences = {}
+
+        for i, line in enumerate(lines):
+            heading_match = self.heading_pattern.match(line)
+            if heading_match:
+                heading_level = len(heading_match.group(1))
+                current_heading = heading_match.group(2).strip()
+                continue
+
+            match = self.todo_pattern.match(line)
+            if match:
+                indent = len(match.group(1))
+                completed = match.group(2).lower() == 'x'
+                text = match.group(3)
+
+                occurrence = occurrences.get(text, 0)
+                occurrences[text] = occurrence + 1
+                todo_id = self.generate_todo_id(str(file_path), text, occurrence)
+
+                is_contiguous = (i == last_todo_line + 1)
+                if not is_contiguous:
+                    group_id = f"{file_path.stem}_{todo_id}"
+                    group_start_line = i + 1
+
+                last_todo_line = i
+
+                context = self.extract_context(lines, i)
+                metadata = self.extract_metadata(text, file_path, i + 1, context)
+                formatted_text = self.render_inline(metadata["text"]) if self.render_html else None
+
+                todos.append({
+                    "id": todo_id,
+                    "file": str(file_path.relative_to(self.data_dir)),
+                    "file_path": str(file_path),
+                    "line_number": i + 1,
+                    "indent_level": indent // 2,
+                    "indent_pixels": indent * 10,
+                    "completed": completed,
+                    "text": metadata["text"],
+                    "formatted_text": formatted_text,
+                    "raw_text": metadata["raw_text"],
+                    "tags": metadata["tags"],
+                    "due_date": metadata["due_date"],
+                    "priority": metadata["priority"],
+                    "context": context,
+                    "created_date": datetime.fromtimestamp(file_path.stat().st_mtime).isoformat(),
+                    "heading": current_heading,
+                    "heading_level": heading_level if current_heading else 0,
+                    "group_id": group_id,
+                    "group_start_line": group_start_line,
+                    "is_contiguous": is_contiguous
+                })
+
+        return todos
+
+
+def time_parse(parser: TodoParser, notes: List[Path], repeat: int) -> float:
+    """Best wall time of parsing every note (file reads excluded)"""
+    contents = [(path, path.read_text()) for path in notes]
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for path, content in contents:
+            parser.parse_todos(content, path)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    args.add_argument("--notes", type=int, default=200, help="number of generated notes")
+    args.add_argument("--todos", type=int, default=40, help="todos per note")
+    args.add_argument("--repeat", type=int, default=5, help="runs per implementation (best is reported)")
+    args.add_argument("--seed", type=int, default=1)
+    options = args.parse_args()
+
+    rng = random.Random(options.seed)
+    with tempfile.TemporaryDirectory() as data_dir:
+        notes = []
+        for n in range(options.notes):
+            path = Path(data_dir) / f"note-{n:04d}.md"
+            path.write_text(generate_note(rng, options.todos))
+            notes.append(path)
+
+        snapshot = Path(data_dir) / ".todo-index"
+        legacy = LegacyTodoParser(data_dir, snapshot_path=snapshot)
+        current = TodoParser(data_dir, snapshot_path=snapshot)
+
+        for path in notes:
+            content = path.read_text()
+            expected = legacy.parse_todos(content, path)
+            if expected != [todo.to_dict() for todo in current.parse_todos(content, path)]:
+                sys.exit(f"Output differs for {path.name}")
+
+        legacy_time = time_parse(legacy, notes, options.repeat)
+        current_time = time_parse(current, notes, options.repeat)
+
+    todos = options.notes * options.todos
+    print(f"{options.notes} notes, {todos} todos, best of {options.repeat}")
+    print(f"legacy:  {legacy_time * 1000:8.1f} ms  ({legacy_time / todos * 1e6:.2f} us/todo)")
+    print(f"current: {current_time * 1000:8.1f} ms  ({current_time / todos * 1e6:.2f} us/todo)")
+    print(f"speedup: {legacy_time / current_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
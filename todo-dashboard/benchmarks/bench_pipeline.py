@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Todo Pipeline Benchmark
+Generates synthetic vaults and times the whole todo pipeline on them:
+scan_all_todos cold and warm, snapshot restarts, parse_todos throughput,
+/todos for every filter and sort combination, /stats and toggles.
+Results are written as JSON; --compare flags regressions against an
+earlier results file and exits non-zero when there are any
+
+Usage: python bench_pipeline.py [--notes N ...] [--output FILE] [--compare FILE]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND))
+
+from parser import TodoParser  # noqa: E402
+from vault_generator import generate_vault  # noqa: E402
+
+# /todos query variants; each is timed with every sort order
+FILTERS = {
+    "all": {},
+    "pending": {"completed": "false"},
+    "completed": {"completed": "true"},
+    "tag": {"tag": "work"},
+    "file": {"file": "folder-000"},
+    "priority": {"priority": "2"},
+    "search": {"search": "review"},
+    "combined": {"completed": "false", "tag": "urgent", "priority": "1"},
+    "page": {"limit": "50"},
+}
+SORTS = ["file", "priority", "date", "recent"]
+
+
+def measure(func: Callable[[], object], repeat: int) -> List[float]:
+    """Wall times of repeat calls, in seconds"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def result(name: str, notes: int, value: float, unit: str, better: str = "lower", **extra) -> Dict:
+    return {"name": name, "notes": notes, "value": round(value, 4), "unit": unit, "better": better, **extra}
+
+
+def latency(name: str, notes: int, samples: List[float]) -> Dict:
+    """Median latency in ms, with the p95 and sample count alongside"""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return result(name, notes, statistics.median(samples) * 1000, "ms",
+                  p95=round(p95 * 1000, 4), runs=len(samples))
+
+
+def bench_parser(vault: Path, notes: int, repeat: int) -> List[Dict]:
+    """Scan and parse timings straight through TodoParser"""
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        snapshot = Path(scratch) / "index"
+
+        parser = TodoParser(vault, snapshot_path=snapshot)
+        started = time.perf_counter()
+        todos = parser.scan_all_todos()
+        results.append(result("scan_all_todos.cold", notes, time.perf_counter() - started, "s",
+                              todos=len(todos)))
+        results.append(latency("scan_all_todos.warm", notes,
+                               measure(parser.scan_all_todos, repeat)))
+
+        parser = TodoParser(vault, snapshot_path=snapshot)
+        started = time.perf_counter()
+        parser.save_snapshot(parser.refresh_index_parallel())
+        results.append(result("refresh_index_parallel.cold", notes, time.perf_counter() - started, "s"))
+
+        def restart():
+            restarted = TodoParser(vault, snapshot_path=snapshot)
+            restarted.load_snapshot()
+            restarted.refresh_index()
+            restarted.snapshot.close()
+        results.append(latency("snapshot_restart", notes, measure(restart, repeat)))
+        parser.snapshot.close()
+
+    contents = [(path, path.read_text()) for path in sorted(vault.rglob("*.md"))]
+    megabytes = sum(len(content.encode()) for _, content in contents) / 1e6
+    for render_html in (True, False):
+        parser = TodoParser(vault, render_html=render_html)
+
+        def parse_all():
+            for path, content in contents:
+                parser.parse_todos(content, path)
+        # The first run fills the render cache like a running server's would
+        parse_all()
+        seconds = statistics.median(measure(parse_all, repeat))
+        name = "parse_todos" if render_html else "parse_todos.lazy_render"
+        results.append(result(name, notes, megabytes / seconds, "MB/s", better="higher"))
+    return results
+
+
+def bench_api(vault: Path, notes: int, repeat: int, toggles: int) -> List[Dict]:
+    """Endpoint timings through the API app in this process"""
+    # api reads its configuration at import time
+    os.environ["TODO_DATA_DIRS"] = str(vault)
+    import api
+    from fastapi.testclient import TestClient
+
+    results = []
+    (vault / ".todo-index").unlink(missing_ok=True)
+    started = time.perf_counter()
+    with TestClient(api.app) as client:
+        while client.get("/stats").json()["status"] != "ready":
+            time.sleep(0.01)
+        results.append(result("api.warm_up", notes, time.perf_counter() - started, "s"))
+
+        for filter_name, query in FILTERS.items():
+            for sort in SORTS + (["relevance"] if "search" in query else []):
+                params = {**query, "sort": sort}
+                # The first request of each query fills the response cache
+                first = measure(lambda: client.get("/todos", params=params), 1)[0]
+                samples = measure(lambda: client.get("/todos", params=params), repeat)
+                results.append(latency(f"GET /todos {filter_name} sort={sort}", notes, samples))
+                results.append(result(f"GET /todos {filter_name} sort={sort} first", notes,
+                                      first * 1000, "ms"))
+
+        results.append(latency("GET /stats", notes, measure(lambda: client.get("/stats"), repeat)))
+
+        rng = random.Random(0)
+        todos = rng.sample(list(api.store.by_id.values()), min(toggles, len(api.store)))
+        samples = []
+        for todo in todos:
+            for _ in range(2):
+                # Toggled twice so the vault is left as generated
+                current = api.store.by_id.get(todo.id) or todo
+                body = {"id": current.id, "file_path": current.file_path, "line_number": current.line_number}
+                started = time.perf_counter()
+                response = client.post("/toggle", json=body)
+                samples.append(time.perf_counter() - started)
+                response.raise_for_status()
+        results.append(latency("POST /toggle", notes, samples))
+    return results
+
+
+def run_size(vault: Path, notes: int, options: Dict) -> List[Dict]:
+    """All benchmarks for one vault size; runs in a fresh process so the API
+    module is configured for this vault"""
+    manifest = generate_vault(vault, notes, options["todos"], options["tag_rate"],
+                              options["date_rate"], options["heading_rate"], options["seed"])
+    print(f"{notes} notes: {manifest['todos']} todos, {manifest['bytes'] / 1e6:.1f} MB", flush=True)
+    results = bench_parser(vault, notes, options["repeat"])
+    if not options["skip_api"]:
+        results += bench_api(vault, notes, options["repeat"], options["toggles"])
+    return results
+
+
+def environment() -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=BACKEND, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results: List[Dict], baseline_path: Path, tolerance: float) -> List[str]:
+    """Descriptions of results that got worse than the baseline by more than tolerance"""
+    baseline = {(r["name"], r["notes"]): r for r in json.loads(baseline_path.read_text())["results"]}
+    regressions = []
+    for current in results:
+        old = baseline.get((current["name"], current["notes"]))
+        if old is None or old["unit"] != current["unit"] or not old["value"]:
+            continue
+        change = current["value"] / old["value"] - 1
+        if current["better"] == "higher":
+            change = -change
+        if change > tolerance:
+            regressions.append(f"{current['name']} ({current['notes']} notes): "
+                               f"{old['value']} -> {current['value']} {current['unit']}")
+    return regressions
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    args.add_argument("--notes", type=int, nargs="+", default=[1000],
+                      help="vault sizes to benchmark, e.g. 1000 10000 100000")
+    args.add_argument("--todos", type=int, default=20, help="mean todos per note")
+    args.add_argument("--tag-rate", type=float, default=0.3, help="share of todos with a tag")
+    args.add_argument("--date-rate", type=float, default=0.2, help="share of todos with a due date")
+    args.add_argument("--heading-rate", type=float, default=0.1, help="share of blocks that are headings")
+    args.add_argument("--seed", type=int, default=1)
+    args.add_argument("--repeat", type=int, default=5, help="samples per measurement")
+    args.add_argument("--toggles", type=int, default=20, help="todos toggled (each twice)")
+    args.add_argument("--skip-api", action="store_true", help="only benchmark the parser")
+    args.add_argument("--vault-dir", type=Path,
+                      help="where generated vaults are kept between runs (default: a temporary directory)")
+    args.add_argument("--output", type=Path, default=Path("bench-results.json"))
+    args.add_argument("--compare", type=Path, help="earlier results file to check for regressions")
+    args.add_argument("--tolerance", type=float, default=0.25,
+                      help="allowed slowdown against --compare before it counts as a regression")
+    options = args.parse_args()
+
+    settings = {key: getattr(options, key) for key in
+                ("todos", "tag_rate", "date_rate", "heading_rate", "seed", "repeat", "toggles", "skip_api")}
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        root = options.vault_dir or Path(scratch)
+        for notes in options.notes:
+            vault = root / f"vault-{notes}-{options.todos}-{options.seed}"
+            # spawn, so every size gets a freshly configured api module
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                results += executor.submit(run_size, vault, notes, settings).result()
+
+    options.output.write_text(json.dumps(
+        {"environment": environment(), "settings": settings, "results": results}, indent=2))
+    for r in results:
+        print(f"{r['notes']:>7}  {r['name']:<45} {r['value']:>12.3f} {r['unit']}")
+    print(f"Results written to {options.output}")
+
+    if options.compare:
+        regressions = compare(results, options.compare, options.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Todo Memory Benchmark
+Measures with tracemalloc how much memory the parsed todos take as Todo
+records versus the plain dicts they replaced, both straight from the
+parser and after a round trip through the snapshot's JSON
+
+Usage: python bench_todo_memory.py [--notes N] [--todos N]
+"""
+
+import argparse
+import gc
+import json
+import random
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from parser import TodoParser  # noqa: E402
+from todo import Todo  # noqa: E402
+from bench_parse_todos import LegacyTodoParser, generate_note  # noqa: E402
+
+
+def measure(build):
+    """Bytes still allocated by the result of build() (which is kept alive)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    args.add_argument("--notes", type=int, default=500, help="number of generated notes")
+    args.add_argument("--todos", type=int, default=200, help="todos per note")
+    args.add_argument("--seed", type=int, default=1)
+    options = args.parse_args()
+
+    rng = random.Random(options.seed)
+    with tempfile.TemporaryDirectory() as data_dir:
+        notes = []
+        for n in range(options.notes):
+            path = Path(data_dir) / f"project-{n % 20}" / f"note-{n:04d}.md"
+            path.parent.mkdir(exist_ok=True)
+            path.write_text(generate_note(rng, options.todos))
+            notes.append((path, path.read_text()))
+
+        snapshot = Path(data_dir) / ".todo-index"
+        legacy = LegacyTodoParser(data_dir, snapshot_path=snapshot)
+        current = TodoParser(data_dir, snapshot_path=snapshot)
+        # Warm the render caches so they are not counted
+        for path, content in notes:
+            legacy.parse_todos(content, path)
+            current.parse_todos(content, path)
+
+        dict_parsed, dicts = measure(lambda: [legacy.parse_todos(c, p) for p, c in notes])
+        todo_parsed, todos = measure(lambda: [current.parse_todos(c, p) for p, c in notes])
+
+        # The snapshot stores todos as JSON; every string comes back as its own copy
+        rows = [json.dumps(file_todos) for file_todos in dicts]
+        dict_loaded, _ = measure(lambda: [json.loads(row) for row in rows])
+        todo_loaded, _ = measure(lambda: [[Todo.from_dict(t) for t in json.loads(row)] for row in rows])
+
+    count = sum(len(file_todos) for file_todos in todos)
+    print(f"{options.notes} notes, {count} todos")
+    print(f"{'':14}{'dicts':>12}{'Todo':>12}{'saved':>8}")
+    for label, before, after in (("parsed", dict_parsed, todo_parsed), ("from snapshot", dict_loaded, todo_loaded)):
+        print(f"{label:14}{before / 2**20:10.1f}MB{after / 2**20:10.1f}MB{1 - after / before:8.0%}"
+              f"   ({before / count:.0f} -> {after / count:.0f} bytes/todo)")
+
+
+if __name__ == "__main__":
+    main()
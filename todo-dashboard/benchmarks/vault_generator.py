@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Synthetic Vault Generator
+Writes reproducible flatnotes-style vaults (headings, prose, lists and todo
+groups with tags, due dates, priorities and inline formatting) for the
+benchmarks
+
+Usage: python vault_generator.py DIR [--notes N] [--todos N] [--seed N]
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+from typing import Dict
+
+WORDS = ["review", "draft", "call", "email", "fix", "plan", "budget", "garden", "API", "docs",
+         "report", "meeting", "invoice", "backup", "server", "groceries", "design", "release"]
+TAGS = ["#work", "#home", "#urgent", "#follow-up", "#q3-planning", "#errand"]
+FORMATTING = ["**bold**", "*italic*", "`code`", "~~struck~~", "[link](https://example.com)", "a & b", '"quoted"']
+
+# Notes per sub-directory, so large vaults look like nested flatnotes folders
+NOTES_PER_DIR = 100
+
+MANIFEST = ".vault.json"
+
+
+def generate_note(rng: random.Random, todo_count: int, tag_rate: float = 0.3,
+                  date_rate: float = 0.2, heading_rate: float = 0.1) -> str:
+    """A note with headings, prose, lists and todo groups in roughly flatnotes
+    proportions. The rates are the chance of a todo carrying a tag or a due
+    date, and of a block being a heading"""
+    lines = [f"# {rng.choice(WORDS).title()} notes", ""]
+    while todo_count > 0:
+        roll = rng.random()
+        if roll < heading_rate:
+            lines += ["", f"{'#' * rng.randint(2, 4)} {rng.choice(WORDS).title()} {rng.choice(WORDS)}", ""]
+        elif roll < heading_rate + 0.2:
+            lines.append(" ".join(rng.choices(WORDS, k=rng.randint(5, 15))) + ".")
+        elif roll < heading_rate + 0.25:
+            lines.append(f"- {rng.choice(WORDS)} {rng.choice(TAGS)}")
+        else:
+            for _ in range(min(todo_count, rng.randint(1, 6))):
+                words = rng.choices(WORDS, k=rng.randint(2, 7))
+                if rng.random() < tag_rate:
+                    words.append(rng.choice(TAGS))
+                if rng.random() < date_rate:
+                    words.append(f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+                if rng.random() < 0.15:
+                    words.insert(rng.randint(0, len(words)), "!" * rng.randint(1, 3))
+                if rng.random() < 0.2:
+                    words.insert(rng.randint(0, len(words)), rng.choice(FORMATTING))
+                indent = "  " * rng.choice([0, 0, 0, 1, 2])
+                lines.append(f"{indent}- [{rng.choice(' xX')}] {' '.join(words)}")
+                todo_count -= 1
+    return "\n".join(lines) + "\n"
+
+
+def generate_vault(path: Path, notes: int, todos: int = 20, tag_rate: float = 0.3,
+                   date_rate: float = 0.2, heading_rate: float = 0.1, seed: int = 1) -> Dict:
+    """Write a vault of generated notes to path and return its manifest.
+
+    todos is the mean number of todos per note; each note gets between 0 and
+    twice that many. A vault already generated with the same parameters is
+    reused as is, so repeated benchmark runs skip the writing.
+    """
+    path = Path(path)
+    params = {"notes": notes, "todos": todos, "tag_rate": tag_rate,
+              "date_rate": date_rate, "heading_rate": heading_rate, "seed": seed}
+    manifest_path = path / MANIFEST
+    try:
+        manifest = json.loads(manifest_path.read_text())
+        if manifest.get("params") == params:
+            return manifest
+    except (OSError, ValueError):
+        pass
+
+    if path.exists() and any(path.iterdir()) and not manifest_path.exists():
+        raise ValueError(f"{path} is not empty and was not written by the generator")
+    for old in path.rglob("*.md"):
+        old.unlink()
+
+    rng = random.Random(seed)
+    todo_total = 0
+    size = 0
+    for n in range(notes):
+        folder = path / f"folder-{n // NOTES_PER_DIR:03d}"
+        folder.mkdir(parents=True, exist_ok=True)
+        count = rng.randint(0, 2 * todos)
+        content = generate_note(rng, count, tag_rate, date_rate, heading_rate)
+        (folder / f"note-{n:06d}.md").write_text(content)
+        todo_total += count
+        size += len(content.encode())
+
+    manifest = {"params": params, "todos": todo_total, "bytes": size}
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    args.add_argument("path", type=Path, help="directory to write the vault to")
+    args.add_argument("--notes", type=int, default=1000, help="number of notes")
+    args.add_argument("--todos", type=int, default=20, help="mean todos per note")
+    args.add_argument("--tag-rate", type=float, default=0.3, help="share of todos with a tag")
+    args.add_argument("--date-rate", type=float, default=0.2, help="share of todos with a due date")
+    args.add_argument("--heading-rate", type=float, default=0.1, help="share of blocks that are headings")
+    args.add_argument("--seed", type=int, default=1)
+    options = args.parse_args()
+
+    manifest = generate_vault(options.path, options.notes, options.todos, options.tag_rate,
+                              options.date_rate, options.heading_rate, options.seed)
+    print(f"{options.path}: {options.notes} notes, {manifest['todos']} todos, "
+          f"{manifest['bytes'] / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
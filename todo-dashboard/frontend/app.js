@@ -1,9 +1,14 @@
 // Todo Dashboard Frontend Application
 
 const API_URL = 'http://localhost:8001';
+const WS_URL = 'ws://localhost:8001/ws';
 const FLATNOTES_URL = 'http://localhost:8080';
 
 let todos = [];
+let todosById = new Map();
+let todosVersion = null;
+let todosInstance = null;  // Server process the version belongs to
+let socket = null;
 let currentView = 'list';
 let filters = {
     status: 'all',
@@ -16,11 +21,87 @@ let filters = {
 // Initialize app
 document.addEventListener('DOMContentLoaded', () => {
     initializeEventListeners();
-    loadTodos();
     loadFilters();
-    setInterval(loadTodos, 30000); // Auto-refresh every 30 seconds
+    setupWebSocket();
+    // Fallback polling while the WebSocket is down
+    setInterval(() => {
+        if (!socket || socket.readyState !== WebSocket.OPEN) {
+            loadTodos();
+        }
+    }, 30000);
 });
 
+// Setup WebSocket connection for push updates
+function setupWebSocket() {
+    const url = todosVersion === null ? WS_URL
+        : `${WS_URL}?since=${todosVersion}&instance=${encodeURIComponent(todosInstance)}`;
+    socket = new WebSocket(url);
+
+    socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type === 'snapshot') {
+            setTodos(message.todos, message.version, message.instance);
+        } else if (message.type === 'patch') {
+            applyPatch(message);
+        }
+    };
+
+    socket.onclose = () => {
+        console.log('WebSocket disconnected - attempting to reconnect...');
+        setTimeout(setupWebSocket, 3000);
+    };
+
+    socket.onerror = (error) => {
+        console.error('WebSocket error:', error);
+    };
+}
+
+function setTodos(newTodos, version, instance) {
+    todosById = new Map(newTodos.map(todo => [todo.id, todo]));
+    todosVersion = version;
+    todosInstance = instance;
+    sortTodos();
+    renderCurrentView();
+    updateStats();
+}
+
+function applyPatch(patch) {
+    if (patch.instance !== todosInstance) {
+        // Versions of another server process - reconnect for a snapshot
+        todosVersion = null;
+        socket.close();
+        return;
+    }
+    if (todosVersion !== null && patch.version <= todosVersion) return;  // Already applied
+    if (patch.base_version !== todosVersion) {
+        // Missed an update - reconnect to get the missing patches or a snapshot
+        socket.close();
+        return;
+    }
+
+    patch.removed.forEach(id => todosById.delete(id));
+    // created_date is per file: {file_path: created_date}
+    const createdDates = patch.files || {};
+    if (Object.keys(createdDates).length > 0) {
+        todosById.forEach(todo => {
+            if (todo.file_path in createdDates) todo.created_date = createdDates[todo.file_path];
+        });
+    }
+    patch.added.concat(patch.changed).forEach(todo => todosById.set(todo.id, todo));
+    todosVersion = patch.version;
+    sortTodos();
+    renderCurrentView();
+    updateStats();
+    if (patch.added.length > 0 || patch.removed.length > 0) {
+        loadFilters();
+    }
+}
+
+function sortTodos() {
+    todos = Array.from(todosById.values());
+    todos.sort((a, b) => a.file.localeCompare(b.file) || a.line_number - b.line_number);
+}
+
 // Event Listeners
 function initializeEventListeners() {
     // View tabs
@@ -66,16 +147,14 @@ function initializeEventListeners() {
 async function loadTodos() {
     try {
         const response = await fetch(`${API_URL}/todos`);
-        todos = await response.json();
-        renderCurrentView();
-        updateStats();
+        setTodos(await response.json(), null, null);
     } catch (error) {
         console.error('Error loading todos:', error);
         showError('Failed to load todos');
     }
 }
 
-async function toggleTodo(filePath, lineNumber) {
+async function toggleTodo(filePath, lineNumber, todoId) {
     try {
         const response = await fetch(`${API_URL}/toggle`, {
             method: 'POST',
@@ -84,14 +163,19 @@ async function toggleTodo(filePath, lineNumber) {
             },
             body: JSON.stringify({
                 file_path: filePath,
-                line_number: lineNumber
+                line_number: lineNumber,
+                id: todoId
             })
         });
 
         if (response.ok) {
-            await loadTodos();
+            // Pushed over the WebSocket when connected
+            if (!socket || socket.readyState !== WebSocket.OPEN) {
+                await loadTodos();
+            }
         } else {
             showError('Failed to toggle todo');
+            renderCurrentView();  // Reset the checkbox
         }
     } catch (error) {
         console.error('Error toggling todo:', error);
@@ -110,7 +194,9 @@ async function refreshTodos() {
         });
 
         if (response.ok) {
-            await loadTodos();
+            if (!socket || socket.readyState !== WebSocket.OPEN) {
+                await loadTodos();
+            }
             showSuccess('Todos refreshed');
         }
     } catch (error) {
@@ -325,7 +411,7 @@ function renderListView(todos) {
                                 <input type="checkbox" 
                                        class="todo-checkbox" 
                                        ${todo.completed ? 'checked' : ''}
-                                       onchange="toggleTodo('${todo.file_path}', ${todo.line_number})">
+                                       onchange="toggleTodo('${todo.file_path}', ${todo.line_number}, '${todo.id}')">
                                 <div class="todo-content">
                                     <div class="todo-text ${todo.completed ? 'completed' : ''}">
                                         ${renderPriority(todo.priority)}
@@ -349,7 +435,7 @@ function renderListView(todos) {
                     <input type="checkbox" 
                            class="todo-checkbox" 
                            ${todo.completed ? 'checked' : ''}
-                           onchange="toggleTodo('${todo.file_path}', ${todo.line_number})">
+                           onchange="toggleTodo('${todo.file_path}', ${todo.line_number}, '${todo.id}')">
                     <div class="todo-content">
                         <div class="todo-text ${todo.completed ? 'completed' : ''}">
                             ${renderPriority(todo.priority)}
@@ -453,7 +539,7 @@ function renderFilesView(todos) {
                             <input type="checkbox" 
                                    class="todo-checkbox" 
                                    ${todo.completed ? 'checked' : ''}
-                                   onchange="toggleTodo('${todo.file_path}', ${todo.line_number})">
+                                   onchange="toggleTodo('${todo.file_path}', ${todo.line_number}, '${todo.id}')">
                             <div class="todo-content">
                                 <div class="todo-text ${todo.completed ? 'completed' : ''}">
                                     ${renderPriority(todo.priority)}
@@ -509,7 +595,7 @@ function renderCalendarView(todos) {
                                     <input type="checkbox" 
                                            class="todo-checkbox" 
                                            ${todo.completed ? 'checked' : ''}
-                                           onchange="toggleTodo('${todo.file_path}', ${todo.line_number})">
+                                           onchange="toggleTodo('${todo.file_path}', ${todo.line_number}, '${todo.id}')">
                                     <div class="todo-content">
                                         <div class="todo-text ${todo.completed ? 'completed' : ''}">
                                             ${renderPriority(todo.priority)}